@@ -0,0 +1,26 @@
+from typing import Optional
+from uuid import UUID
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from .models import User
+
+# Authenticated principals keyed by (user id, token jti). Entries are detached
+# User rows, so they are only safe for reading attributes.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+)
+
+
+def get_cached_principal(user_id: UUID, jti: str) -> Optional[User]:
+    return principal_cache.get((user_id, jti))
+
+
+def cache_principal(user_id: UUID, jti: str, user: User) -> None:
+    principal_cache.set((user_id, jti), user)
+
+
+def invalidate_principal(user_id: UUID) -> None:
+    """Drop every cached principal of a user, whatever token it was cached under."""
+    principal_cache.pop_where(lambda key: key[0] == user_id)
@@ -5,9 +5,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.v1.auth.errors import raise_access_token_required_exception, raise_account_not_verified_exception, raise_insufficient_permission_exception, raise_invalid_token_exception, raise_refresh_token_required_exception
 from app.core.database import async_get_db
 from .models import User
+from .cache import cache_principal, get_cached_principal
 from app.core.redis import token_in_blocklist
 from .services.service import UserService
-from .utils import decode_token
+from .utils import verify_token
 from uuid import UUID
 
 user_service = UserService()
@@ -22,19 +23,16 @@ class TokenBearer(HTTPBearer):
         if not creds:
             return None
         token = creds.credentials
-        token_data = decode_token(token)
+        token_data = verify_token(token)
         if not token_data:
             raise raise_invalid_token_exception()
-        if not self.token_valid(token):
-            raise raise_invalid_token_exception()
         if await token_in_blocklist(token_data["jti"]):
             raise raise_invalid_token_exception()
         self.verify_token_data(token_data)
         return token_data 
 
     def token_valid(self, token: str) -> bool:
-        token_data = decode_token(token)
-        return token_data is not None
+        return verify_token(token) is not None
 
     def verify_token_data(self, token_data):
         raise NotImplementedError(
@@ -58,7 +56,14 @@ async def get_current_user(
     session: AsyncSession = Depends(async_get_db),
 ):
     user_id = UUID(token_details["user"]["id"])  # Convert to UUID
-    user = await user_service.get_user_by_id(user_id, session)
+    jti = token_details["jti"]
+    user = get_cached_principal(user_id, jti)
+    if user is None:
+        user = await user_service.get_user_by_id(user_id, session)
+        if user is not None:
+            # Detach so the cached row is never flushed by another request's session
+            session.expunge(user)
+            cache_principal(user_id, jti, user)
     return user
 
 
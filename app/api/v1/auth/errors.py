@@ -109,6 +109,17 @@ def raise_is_oauth_user_exception() -> HTTPException:
         }
     )
 
+def raise_password_hasher_busy_exception() -> HTTPException:
+    """ Raises an HTTPException indicating that too many password checks are already queued. """
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail={
+            "message": "Server is busy, please try again shortly",
+            "error_code": "password_hasher_busy"
+        },
+        headers={"Retry-After": "1"}
+    )
+
 
 
 def register_general_error_handlers(app: FastAPI):
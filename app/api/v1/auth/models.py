@@ -12,7 +12,9 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
-    UniqueConstraint
+    Index,
+    UniqueConstraint,
+    text
 )
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -119,11 +121,25 @@ class TwoFactorConfirmation(Base):
 
 class Activity(Base):
     __tablename__ = "activities"
+    # Monthly range partitions on created_at, created and dropped by maintain_activity_partitions.
+    # The timeline index covers every column, so a user's latest activity is an index-only read.
+    __table_args__ = (
+        Index(
+            "ix_activities_user_id_created_at",
+            "user_id",
+            text("created_at DESC"),
+            postgresql_include=["id", "activity_type", "description"],
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     description: Mapped[str] = mapped_column(String, nullable=False)
     activity_type: Mapped[str] = mapped_column(default=ActivityType.CREATE.value)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # Part of the key because a partitioned table's primary key must include the partition column
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc)
+    )
 
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     user: Mapped["User"] = relationship(back_populates="activities")
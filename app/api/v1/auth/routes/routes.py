@@ -29,8 +29,8 @@ from ..services.service import UserService
 from ..utils import (
     create_access_token,
     create_auth_tokens,
-    verify_password,
-    generate_passwd_hash,
+    verify_password_async,
+    generate_passwd_hash_async,
 )
 from ..errors import (
     raise_invalid_credentials_exception,
@@ -190,7 +190,7 @@ async def login_users(
     if user.password_hash is None:
         raise raise_is_oauth_user_exception()
 
-    if user and verify_password(password, user.password_hash):
+    if user and await verify_password_async(password, user.password_hash):
         # check if user email is verified
         if not user.is_verified:
             token_data = await token_service.generate_verification_token(
@@ -415,7 +415,7 @@ async def reset_account_password(
         if not user:
             raise raise_user_not_found_exception()
 
-        passwd_hash = generate_passwd_hash(new_password)
+        passwd_hash = await generate_passwd_hash_async(new_password)
         await user_service.update_user(user, {"password_hash": passwd_hash}, session)
 
         return JSONResponse(
@@ -458,8 +458,8 @@ async def password_reset(
         raise raise_user_not_found_exception()
     if not user.password_hash:
         raise raise_is_oauth_user_exception()
-    if user and verify_password(old_password, user.password_hash):
-        passwd_hash = generate_passwd_hash(new_password)
+    if user and await verify_password_async(old_password, user.password_hash):
+        passwd_hash = await generate_passwd_hash_async(new_password)
         await user_service.update_user(user, {"password_hash": passwd_hash}, session)
         return JSONResponse(
             content={"message": "Password reset Successfully"},
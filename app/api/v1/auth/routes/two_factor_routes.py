@@ -151,7 +151,5 @@ async def disable_2fa(
     token_obj = await token_service.get_two_factor_token_by_email(user.email, session)
     if token_obj:
         await session.delete(token_obj)
-        await session.commit()
-        await session.refresh(token_obj)
 
     return {"message": "2FA disabled successfully"}
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import List, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from ..models import Activity
+
+
+class ActivitySink:
+    """Write-behind buffer for activity rows.
+
+    Rows are queued in memory and written by one background task in
+    multi-row INSERTs, once ACTIVITY_BATCH_SIZE rows are waiting or
+    ACTIVITY_FLUSH_INTERVAL seconds after the first one arrived. When the
+    queue is full, add waits up to ACTIVITY_ENQUEUE_TIMEOUT for room and
+    then drops the row and counts it, so a backlog never spills over into
+    the request pool. Shutdown drains the queue, so otherwise rows are only
+    lost if the process dies without one, and then at most
+    ACTIVITY_QUEUE_SIZE of them.
+    """
+
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.running = False
+        self.written = 0
+        self.dropped = 0
+        self._queue: "asyncio.Queue[Optional[dict]]" = asyncio.Queue(maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self._full = False
+
+    def start(self) -> None:
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def add(self, row: dict) -> None:
+        if not self.running:
+            # Committed during shutdown, after the writer stopped
+            await self._write([row])
+            return
+        try:
+            self._queue.put_nowait(row)
+            self._full = False
+            return
+        except asyncio.QueueFull:
+            pass
+        try:
+            await asyncio.wait_for(self._queue.put(row), settings.ACTIVITY_ENQUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            if not self._full:
+                # Once per backlog; the dropped counter has the total
+                logging.warning("Activity queue full, dropping rows until it drains")
+            self._full = True
+
+    async def stop(self) -> None:
+        """Stop taking rows and write out everything queued."""
+        if not self.running:
+            return
+        self.running = False
+        await self._queue.put(None)
+        try:
+            await asyncio.wait_for(self._task, settings.ACTIVITY_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.error("Activity sink drain timed out with %s rows queued", self._queue.qsize())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            batch: List[dict] = []
+            row = await self._queue.get()
+            deadline = loop.time() + self.flush_interval
+            while row is not None:
+                batch.append(row)
+                timeout = deadline - loop.time()
+                if len(batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            # None is the shutdown sentinel, queued behind every pending row
+            closing = row is None
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, rows: List[dict]) -> None:
+        for attempt in range(1, settings.ACTIVITY_WRITE_RETRIES + 1):
+            try:
+                async with AsyncSessionLocal() as session:
+                    await session.execute(insert(Activity), rows)
+                    await session.commit()
+                self.written += len(rows)
+                return
+            except IntegrityError as e:
+                # Usually a user deleted since the action; keep the rest of the batch
+                if len(rows) == 1:
+                    self.dropped += 1
+                    logging.warning("Dropped activity row for user %s: %s", rows[0]["user_id"], e)
+                    return
+                for row in rows:
+                    await self._write([row])
+                return
+            except Exception as e:
+                logging.warning("Activity write failed (attempt %s): %s", attempt, e)
+                await asyncio.sleep(settings.ACTIVITY_WRITE_BACKOFF * attempt)
+        self.dropped += len(rows)
+        logging.error("Dropped %s activity rows after %s attempts", len(rows), settings.ACTIVITY_WRITE_RETRIES)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+activity_sink = ActivitySink(
+    maxsize=settings.ACTIVITY_QUEUE_SIZE,
+    batch_size=settings.ACTIVITY_BATCH_SIZE,
+    flush_interval=settings.ACTIVITY_FLUSH_INTERVAL,
+)
@@ -1,16 +1,25 @@
+import logging
+import re
+import uuid
+from datetime import date, datetime, timezone
 from uuid import UUID
 from fastapi import Depends
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import async_get_db
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_get_db, on_commit
 from ..models import Activity, User
 from ..schemas.schemas import GoogleUserCreateModel, UserCreateModel, UserModel
-from ..utils import generate_passwd_hash
+from ..utils import generate_passwd_hash_async
+from ..cache import invalidate_principal
+from .activity_sink import activity_sink
 from typing import Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import delete, select
+from sqlalchemy import delete, select, text
 from sqlalchemy import desc
 
+_PARTITION_NAME = re.compile(r"^activities_(\d{4})_(\d{2})$")
+
 class UserService:
     async def get_users(
         self,
@@ -52,13 +61,11 @@ class UserService:
 
     async def create_user(self, user_data: UserCreateModel, session: AsyncSession = Depends(async_get_db)) -> User:
         user_data_dict = user_data.model_dump()
-        user_data_dict["password_hash"] = generate_passwd_hash(
+        user_data_dict["password_hash"] = await generate_passwd_hash_async(
             user_data_dict.pop("password"))
         new_user = User(**user_data_dict)
         session.add(new_user)
-        await session.commit()
-        # Ensure we return the updated instance
-        await session.refresh(new_user)
+        await session.flush()
         return new_user
 
     async def update_user(
@@ -82,8 +89,8 @@ class UserService:
             if hasattr(user_object, key):
                 setattr(user_object, key, value)
 
-        await session.commit()
-        await session.refresh(user_object)  # Refresh instance after commit
+        await session.flush()
+        on_commit(session, invalidate_principal, user_object.id)
         return user_object
 
     async def delete_user(self, user_id: UUID, session: AsyncSession = Depends(async_get_db)) -> bool:
@@ -95,7 +102,8 @@ class UserService:
             return False  # User not found
 
         await session.delete(user)
-        await session.commit()
+        await session.flush()
+        on_commit(session, invalidate_principal, user_id)
         return True  # User deleted successfully
 
     async def create_google_user(self, user_data: GoogleUserCreateModel, session: AsyncSession = Depends(async_get_db)) -> User:
@@ -112,9 +120,7 @@ class UserService:
             login_provider="google",
         )
         session.add(new_user)
-        await session.commit()
-        # Ensure we return the updated instance
-        await session.refresh(new_user)
+        await session.flush()
         return new_user
     
     async def change_user_role(
@@ -128,8 +134,8 @@ class UserService:
             return None  # User not found
         user.role = new_role
         session.add(user)
-        await session.commit()
-        await session.refresh(user)
+        await session.flush()
+        on_commit(session, invalidate_principal, user_id)
         return user
 
     async def update_google_user(
@@ -150,14 +156,23 @@ class UserService:
         user.is_verified = user_data_dict.get(
             "email_verified", user.is_verified)
 
-        # Commit the updates
+        # Apply the updates
         session.add(user)
-        await session.commit()
-        await session.refresh(user)
+        await session.flush()
+        on_commit(session, invalidate_principal, user.id)
 
         return user
 
 
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"activities_{month:%Y_%m}"
+
+
 class ActivityService:
     async def get_user_activity(
         self,
@@ -179,12 +194,82 @@ class ActivityService:
         description: str,
         session: AsyncSession  # Explicitly required
     ) -> Activity:
-        new_activity = Activity(
-            user_id=user_id,
-            activity_type=activity_type,
-            description=description
-        )
+        row = {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "activity_type": activity_type,
+            "description": description,
+            "created_at": datetime.now(timezone.utc),
+        }
+        if activity_sink.running:
+            # Queued once the request commits and written in batches, off the request path
+            on_commit(session, activity_sink.add, row)
+            return Activity(**row)
+        new_activity = Activity(**row)
         session.add(new_activity)
+        return new_activity
+
+    async def create_partition(self, month: date, session: AsyncSession) -> None:
+        """Create the activities partition for the month starting at `month`, if missing."""
+        await session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} PARTITION OF activities "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+            f"TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+        ))
+
+    async def get_partition_months(self, session: AsyncSession) -> List[date]:
+        """Months that currently have a partition, skipping the default one."""
+        result = await session.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = 'activities'"
+        ))
+        months = []
+        for name in result.scalars():
+            match = _PARTITION_NAME.match(name)
+            if match:
+                months.append(date(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+
+
+async def maintain_activity_partitions() -> None:
+    """Scheduled job: create the coming months' activity partitions and drop expired ones.
+
+    Dropping a whole partition replaces row-by-row DELETEs for retention.
+    Each change commits on its own, so one failure doesn't hold up the rest.
+    """
+    service = ActivityService()
+    today = datetime.now(timezone.utc).date()
+    this_month = today.replace(day=1)
+    cutoff = _add_months(this_month, -settings.ACTIVITY_RETENTION_MONTHS)
+
+    async with AsyncSessionLocal() as session:
+        existing = set(await service.get_partition_months(session))
         await session.commit()
-        await session.refresh(new_activity)
-        return new_activity
\ No newline at end of file
+
+        for ahead in range(settings.ACTIVITY_PARTITIONS_AHEAD + 1):
+            month = _add_months(this_month, ahead)
+            if month in existing:
+                continue
+            try:
+                # Attaching a partition locks the parent; give up rather than queue traffic behind it
+                await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+                await service.create_partition(month, session)
+                await session.commit()
+                logging.info("Created activity partition %s", _partition_name(month))
+            except Exception as e:
+                await session.rollback()
+                logging.warning("Creating activity partition %s failed: %s", _partition_name(month), e)
+
+        for month in sorted(existing):
+            if _add_months(month, 1) > cutoff:
+                break
+            try:
+                await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+                await session.execute(text(f"DROP TABLE IF EXISTS {_partition_name(month)}"))
+                await session.commit()
+                logging.info("Dropped expired activity partition %s", _partition_name(month))
+            except Exception as e:
+                await session.rollback()
+                logging.warning("Dropping activity partition %s failed: %s", _partition_name(month), e)
@@ -37,8 +37,7 @@ class TokenService:
         new_token = VerificationToken(
             email=email, token=token, expires=expires)
         db.add(new_token)
-        await db.commit()
-        await db.refresh(new_token)
+        await db.flush()
         return new_token
 
     # Generate Password Reset Token
@@ -57,8 +56,7 @@ class TokenService:
         new_token = PasswordResetToken(
             email=email, token=token, expires=expires)
         db.add(new_token)
-        await db.commit()
-        await db.refresh(new_token)
+        await db.flush()
         return new_token
 
     # Generate Two-Factor Token
@@ -77,8 +75,7 @@ class TokenService:
 
         new_token = TwoFactorToken(email=email, token=token, expires=expires)
         db.add(new_token)
-        await db.commit()
-        await db.refresh(new_token)
+        await db.flush()
         return new_token
 
     # Get Verification Token by Token
@@ -147,8 +144,7 @@ class TokenService:
         else:
             new_confirmation = TwoFactorConfirmation(user_id=user_id)
             db.add(new_confirmation)
-            await db.commit()
-            await db.refresh(new_confirmation)
+            await db.flush()
             return new_confirmation
 
     async def disable_two_factor_for_user(self, user_id: str, db: AsyncSession) -> bool:
@@ -162,7 +158,6 @@ class TokenService:
             await db.execute(delete(TwoFactorConfirmation).where(
                 TwoFactorConfirmation.user_id == user_id)
             )
-            await db.commit()
             return True
         else:
             return False
@@ -1,18 +1,35 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from app.api.v1.auth.errors import raise_password_hasher_busy_exception
 from app.api.v1.auth.models import User
 from app.core.config import settings
 from passlib.context import CryptContext
 import logging
+import time
 import uuid
 from datetime import datetime, timedelta
 from itsdangerous import URLSafeTimedSerializer
 import jwt as pyjwt
+from app.core.cache import TTLCache
 
 
 passwd_context = CryptContext(schemes=["bcrypt"])
 
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop.
+# Calls beyond the queue limit are shed with a 503 instead of piling up.
+passwd_hash_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="passwd-hash"
+)
+_pending_passwd_hashes = 0
+
 ACCESS_TOKEN_EXPIRY = settings.ACCESS_TOKEN_EXPIRY
 REFRESH_TOKEN_EXPIRY = settings.REFRESH_TOKEN_EXPIRY
 
+# Payloads of recently verified tokens, so hot clients skip the HMAC and JSON parse
+verified_token_memo = TTLCache(
+    maxsize=settings.TOKEN_MEMO_SIZE, ttl=settings.TOKEN_MEMO_TTL
+)
+
 
 def generate_passwd_hash(password: str) -> str:
     hash = passwd_context.hash(password)
@@ -23,6 +40,30 @@ def verify_password(password: str, hash: str) -> bool:
     return passwd_context.verify(password, hash)
 
 
+async def _run_in_passwd_hash_pool(func, *args):
+    global _pending_passwd_hashes
+    if _pending_passwd_hashes >= settings.PASSWORD_HASH_QUEUE_LIMIT:
+        raise raise_password_hasher_busy_exception()
+    _pending_passwd_hashes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(passwd_hash_pool, func, *args)
+    finally:
+        _pending_passwd_hashes -= 1
+
+
+async def generate_passwd_hash_async(password: str) -> str:
+    return await _run_in_passwd_hash_pool(generate_passwd_hash, password)
+
+
+async def verify_password_async(password: str, hash: str) -> bool:
+    return await _run_in_passwd_hash_pool(verify_password, password, hash)
+
+
+def shutdown_passwd_hash_pool() -> None:
+    passwd_hash_pool.shutdown(wait=False, cancel_futures=True)
+
+
 def create_access_token(
     user_data: dict, expiry: timedelta = timedelta(seconds=ACCESS_TOKEN_EXPIRY), refresh: bool = False
 ):
@@ -54,10 +95,26 @@ def decode_token(token: str) -> dict | None:
         return token_data
 
     except pyjwt.PyJWTError as e:
-        logging.exception(e)
+        logging.warning("Token decode failed: %s", e)
         return None
 
 
+def verify_token(token: str) -> dict | None:
+    """Decode a token once and memoize its payload until the memo TTL or the token expiry."""
+    token_data = verified_token_memo.get(token)
+    if token_data is not None:
+        return token_data
+
+    token_data = decode_token(token)
+    if token_data is None:
+        return None
+
+    ttl = min(settings.TOKEN_MEMO_TTL, token_data.get("exp", 0) - time.time())
+    if ttl > 0:
+        verified_token_memo.set(token, token_data, ttl=ttl)
+    return token_data
+
+
 serializer = URLSafeTimedSerializer(
     secret_key=settings.JWT_SECRET, salt="email-configuration"
 )
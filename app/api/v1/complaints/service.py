@@ -14,8 +14,7 @@ class ComplaintService:
         complaint_dict = complaint_data.model_dump()
         complaint = Complaint(**complaint_dict)
         session.add(complaint)
-        await session.commit()
-        await session.refresh(complaint)
+        await session.flush()
         return complaint
 
     async def get_complaints(self, user_id: UUID, session: AsyncSession) -> List[Complaint]:
@@ -34,5 +33,5 @@ class ComplaintService:
         if not complaint:
             return False
         await session.delete(complaint)
-        await session.commit()
+        await session.flush()
         return True
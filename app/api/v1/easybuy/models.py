@@ -5,8 +5,8 @@ from enum import Enum
 import uuid
 from annotated_types import T
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import String, Text, Numeric, Integer, DateTime, ForeignKey, JSON,Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy import String, Text, Numeric, Integer, DateTime, ForeignKey, Index, CheckConstraint, Computed, Enum as SQLEnum
 
 from app.core.database import Base
 if TYPE_CHECKING:
@@ -46,6 +46,11 @@ class ProductCategoryEnum(str, Enum):
     SOFTWARE = "software"
 
 
+PRODUCT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
 class EasybuyPlan(Base):
     __tablename__ = "easybuy_plans"
 
@@ -66,6 +71,9 @@ class EasybuyPlan(Base):
 
 class EasybuySubscription(Base):
     __tablename__ = "easybuy_subscriptions"
+    __table_args__ = (
+        Index("ix_easybuy_subscriptions_created_at_id", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(
@@ -83,6 +91,15 @@ class EasybuySubscription(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_products_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_products_tags", "tags", postgresql_using="gin", postgresql_ops={"tags": "jsonb_path_ops"}),
+        Index("ix_products_category", "category"),
+        Index("ix_products_owner_id", "owner_id"),
+        Index("ix_products_price", "price"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     owner_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
@@ -92,7 +109,7 @@ class Product(Base):
     quantity: Mapped[int] = mapped_column(Integer)
     image: Mapped[str] = mapped_column(String)  # URL to image
     category: Mapped[ProductCategoryEnum] = mapped_column(SQLEnum(ProductCategoryEnum), nullable=True)
-    tags: Mapped[List[str]] = mapped_column(JSON, default=list)
+    tags: Mapped[List[str]] = mapped_column(JSONB, default=list)
     redirect_link: Mapped[str] = mapped_column(String)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at: Mapped[datetime] = mapped_column(
@@ -100,6 +117,20 @@ class Product(Base):
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc)
     )
+    # Review aggregates, maintained by ProductService as reviews change
+    rating_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    rating_1: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    rating_2: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    rating_3: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    rating_4: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    rating_5: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Maintained by Postgres; name outranks description. Deferred so it is never loaded.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(PRODUCT_SEARCH_VECTOR, persisted=True),
+        deferred=True
+    )
 
     owner: Mapped["User"] = relationship("User", back_populates="products", passive_deletes=True)
     reviews: Mapped[List["ProductReview"]] = relationship(
@@ -109,9 +140,26 @@ class Product(Base):
         passive_deletes=True
     )
 
+    @property
+    def review_count(self) -> int:
+        return self.rating_count or 0
+
+    @property
+    def average_rating(self) -> Optional[float]:
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    @property
+    def rating_histogram(self) -> dict[int, int]:
+        return {rating: getattr(self, f"rating_{rating}") or 0 for rating in range(1, 6)}
+
 
 class ProductReview(Base):
     __tablename__ = "product_reviews"
+    __table_args__ = (
+        CheckConstraint("rating BETWEEN 1 AND 5", name="ck_product_reviews_rating_range"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"))
@@ -4,12 +4,13 @@ from app.api.v1.auth.dependencies import get_current_user
 from app.api.v1.auth.schemas.schemas import UserResponseModel as UserResponse
 from app.api.v1.auth.services.service import ActivityService, UserService
 from app.api.v1.easybuy.models import ProductCategoryEnum
-from app.core.database import async_get_db
-from typing import List
+from app.core.database import async_get_db, async_get_read_db
+from typing import List, Optional
 from uuid import UUID
-from app.api.v1.easybuy.schemas import EasybuyChangeSubscriptionPlan, EasybuyChangeSubscriptionStatus, EasybuyPlanCreate, EasybuyPlanResponse, EasybuySubscriptionCreate, EasybuySubscriptionResponse, ProductCreate, ProductResponse, ProductReviewCreate, ProductReviewResponse
+from app.api.v1.easybuy.schemas import EasybuyChangeSubscriptionPlan, EasybuyChangeSubscriptionStatus, EasybuyPlanCreate, EasybuyPlanResponse, EasybuySubscriptionCreate, EasybuySubscriptionResponse, ProductBrowseFilters, ProductBrowseResponse, ProductCreate, ProductResponse, ProductReviewCreate, ProductReviewResponse
 from app.api.v1.easybuy.service import EasybuyService, EasybuySubscriptionService, ProductService
 from app.core.config import settings
+from app.core.pagination import set_next_cursor
 from app.core.firebase import send_single_notification
 
 
@@ -45,9 +46,10 @@ async def create_product(product: ProductCreate, session: AsyncSession = Depends
 
 
 @easybuy_product_router.get("/", response_model=List[ProductResponse])
-async def get_products(limit: int = 50, offset: int = 0, session: AsyncSession = Depends(async_get_db), _: UserResponse = Depends(get_current_user)):
-    """Get all products with pagination"""
-    products = await product_service.get_products(session, limit, offset)
+async def get_products(response: Response, limit: int = 50, offset: int = 0, cursor: Optional[str] = None, session: AsyncSession = Depends(async_get_read_db), _: UserResponse = Depends(get_current_user)):
+    """Get all products with pagination; follow the X-Next-Cursor header for the next page"""
+    products = await product_service.get_products_cached(session, limit, offset, cursor)
+    set_next_cursor(response, products, limit)
     return products
 
 
@@ -58,6 +60,57 @@ async def get_user_products(limit: int = 50, offset: int = 0, session: AsyncSess
     return products
 
 
+@easybuy_product_router.get("/search", response_model=List[ProductResponse])
+async def search_products(query: str, limit: int = 50, offset: int = 0, session: AsyncSession = Depends(async_get_read_db), _: UserResponse = Depends(get_current_user)):
+    """Search for products by name or description"""
+    if not query:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Query parameter is required")
+
+    # Use regex to find products that match the query in name or description
+    products = await product_service.search_products(query, session, limit, offset)
+
+    return products
+
+
+@easybuy_product_router.get("/products-by-cate", response_model=List[ProductResponse])
+async def get_products_by_category(category: ProductCategoryEnum, limit: int = 50, offset: int = 0, session: AsyncSession = Depends(async_get_read_db), _: UserResponse = Depends(get_current_user)):
+    """Get products by category with pagination"""
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Category parameter is required")
+
+    # Validate category
+    if not isinstance(category, ProductCategoryEnum):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid category")
+
+    # Fetch products by category
+    products = await product_service.get_products_by_category(category, session, limit, offset)
+
+    return products
+
+
+@easybuy_product_router.get("/browse", response_model=ProductBrowseResponse)
+async def browse_products(
+    response: Response,
+    filters: ProductBrowseFilters = Depends(),
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(async_get_read_db),
+    _: UserResponse = Depends(get_current_user)
+):
+    """Browse products by category, tag, price range and owner, with a count per facet value.
+    Follow the X-Next-Cursor header for the next page"""
+    if filters.min_price is not None and filters.max_price is not None and filters.min_price > filters.max_price:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="min_price cannot be greater than max_price")
+    products = await product_service.browse_products(filters, session, limit, cursor)
+    facets = await product_service.get_product_facets(filters, session)
+    set_next_cursor(response, products, limit)
+    return ProductBrowseResponse(items=products, facets=facets)
+
+
 @easybuy_product_router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(product_id: UUID, product: ProductCreate, session: AsyncSession = Depends(async_get_db), _: UserResponse = Depends(get_current_user)):
     """Update an existing product"""
@@ -75,9 +128,9 @@ async def update_product(product_id: UUID, product: ProductCreate, session: Asyn
 
 
 @easybuy_product_router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: UUID, session: AsyncSession = Depends(async_get_db), _: UserResponse = Depends(get_current_user)):
+async def get_product(product_id: UUID, session: AsyncSession = Depends(async_get_read_db), _: UserResponse = Depends(get_current_user)):
     """Get a product by ID"""
-    product = await product_service.get_product_by_id(product_id, session)
+    product = await product_service.get_product_cached(product_id, session)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
@@ -100,36 +153,6 @@ async def delete_product(product_id: UUID, session: AsyncSession = Depends(async
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
-@easybuy_product_router.get("/search", response_model=List[ProductResponse])
-async def search_products(query: str, limit: int = 50, offset: int = 0, session: AsyncSession = Depends(async_get_db), _: UserResponse = Depends(get_current_user)):
-    """Search for products by name or description"""
-    if not query:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Query parameter is required")
-
-    # Use regex to find products that match the query in name or description
-    products = await product_service.search_products(query, session, limit, offset)
-
-    return products
-
-
-@easybuy_product_router.get("/products-by-cate", response_model=List[ProductResponse])
-async def get_products_by_category(category: ProductCategoryEnum, limit: int = 50, offset: int = 0, session: AsyncSession = Depends(async_get_db), _: UserResponse = Depends(get_current_user)):
-    """Get products by category with pagination"""
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Category parameter is required")
-
-    # Validate category
-    if not isinstance(category, ProductCategoryEnum):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid category")
-
-    # Fetch products by category
-    products = await product_service.get_products_by_category(category, session, limit, offset)
-
-    return products
-
 # -------------------------------------------------------
 # product reviews routes
 # -------------------------------------------------------
@@ -263,9 +286,9 @@ async def update_plan(plan_id: UUID, plan: EasybuyPlanCreate, session: AsyncSess
 
 
 @easybuy_plan_router.get("/{plan_id}", response_model=EasybuyPlanResponse)
-async def get_plan(plan_id: UUID, session: AsyncSession = Depends(async_get_db)):
+async def get_plan(plan_id: UUID, session: AsyncSession = Depends(async_get_read_db)):
     """Get an easybuy plan by ID"""
-    plan = await easybuy_service.get_plan_by_id(plan_id, session)
+    plan = await easybuy_service.get_plan_cached(plan_id, session)
     if not plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
@@ -273,9 +296,9 @@ async def get_plan(plan_id: UUID, session: AsyncSession = Depends(async_get_db))
 
 
 @easybuy_plan_router.get("/", response_model=List[EasybuyPlanResponse])
-async def get_plans(limit: int = 50, offset: int = 0, session: AsyncSession = Depends(async_get_db)):
+async def get_plans(limit: int = 50, offset: int = 0, session: AsyncSession = Depends(async_get_read_db)):
     """Get all easybuy plans with pagination"""
-    plans = await easybuy_service.get_plans(session, limit, offset)
+    plans = await easybuy_service.get_plans_cached(session, limit, offset)
     return plans
 
 
@@ -319,9 +342,10 @@ async def create_subscription(
 
 
 @easybuy_subcription_router.get("/", response_model=List[EasybuySubscriptionResponse])
-async def get_subscriptions(limit: int = 50, offset: int = 0, session: AsyncSession = Depends(async_get_db), _: UserResponse = Depends(get_current_user)):
-    """Get all easybuy subscriptions with pagination"""
-    subscriptions = await easybuy_subscription_service.get_subscriptions(session, limit, offset)
+async def get_subscriptions(response: Response, limit: int = 50, offset: int = 0, cursor: Optional[str] = None, session: AsyncSession = Depends(async_get_db), _: UserResponse = Depends(get_current_user)):
+    """Get all easybuy subscriptions with pagination; follow the X-Next-Cursor header for the next page"""
+    subscriptions = await easybuy_subscription_service.get_subscriptions(session, limit, offset, cursor)
+    set_next_cursor(response, subscriptions, limit)
     return subscriptions
 
 
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, UUID4, Field, HttpUrl, field_serializer
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from app.api.v1.auth.schemas.schemas import UserModel, UserResponseModel
 from app.api.v1.easybuy.models import BillingCategoryEnum, BillingCycleEnum, ProductCategoryEnum, SubscriptionStatus
 from enum import Enum
@@ -145,6 +145,7 @@ class ProductResponse(ProductBase):
 
     average_rating: Optional[float] = None
     review_count: Optional[int] = None
+    rating_histogram: Optional[Dict[int, int]] = None
 
     owner: Optional[UserResponseModel] = None
 
@@ -164,11 +165,39 @@ class ProductResponse(ProductBase):
         from_attributes = True
 
 
+class ProductBrowseFilters(BaseModel):
+    """Filters for faceted product browsing"""
+    category: Optional[ProductCategoryEnum] = None
+    tag: Optional[str] = None
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+    owner_id: Optional[UUID4] = None
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class ProductFacets(BaseModel):
+    """Product counts per facet value"""
+    categories: List[FacetCount] = []
+    tags: List[FacetCount] = []
+    owners: List[FacetCount] = []
+    price_ranges: List[FacetCount] = []
+
+
+class ProductBrowseResponse(BaseModel):
+    """Schema for a page of browsed products with facet counts"""
+    items: List[ProductResponse]
+    facets: ProductFacets
+
+
 class ProductReviewBase(BaseModel):
     """Base schema for ProductReview model"""
     product_id: UUID4
     user_id: UUID4
-    rating: int
+    rating: int = Field(..., ge=1, le=5)
     comment: Optional[str] = None
 
     @field_serializer("product_id")
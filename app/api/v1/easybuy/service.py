@@ -1,3 +1,4 @@
+import re
 from typing import List
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,8 +8,12 @@ from .schemas import *
 from .models import EasybuyPlan, EasybuySubscription, Product, ProductReview
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from sqlalchemy import desc
+from sqlalchemy import desc, func, update
+from app.core.cache import cached, invalidate_tags
+from app.core.config import settings
+from app.core.database import on_commit
 from sqlalchemy.orm import selectinload
+from app.core.pagination import paginate
 
 
 class EasybuyService:
@@ -24,13 +29,23 @@ class EasybuyService:
         result = await session.execute(statement)
         return result.scalars().first()
 
+    @cached(List[EasybuyPlanResponse], tags=("plans",))
+    async def get_plans_cached(self, session: AsyncSession, limit: int = 10, offset: int = 0) -> List[EasybuyPlanResponse]:
+        """Read-through cached get_plans, for the public routes"""
+        return await self.get_plans(session, limit, offset)
+
+    @cached(Optional[EasybuyPlanResponse], tags=("plans",))
+    async def get_plan_cached(self, plan_id: UUID, session: AsyncSession) -> Optional[EasybuyPlanResponse]:
+        """Read-through cached get_plan_by_id, for the public routes"""
+        return await self.get_plan_by_id(plan_id, session)
+
     async def create_plan(self, plan_data: EasybuyPlanCreate, session: AsyncSession) -> EasybuyPlan:
         """Create a new Easybuy plan"""
         plan_data_dict = plan_data.model_dump()
         new_plan = EasybuyPlan(**plan_data_dict)
         session.add(new_plan)
-        await session.commit()
-        await session.refresh(new_plan)
+        await session.flush()
+        on_commit(session, invalidate_tags, "plans")
         return new_plan
 
     async def update_plan(self, plan_id: UUID, plan_data: EasybuyPlanCreate, session: AsyncSession) -> Optional[EasybuyPlan]:
@@ -39,8 +54,8 @@ class EasybuyService:
         if plan:
             for key, value in plan_data.model_dump(exclude_unset=True).items():
                 setattr(plan, key, value)
-            await session.commit()
-            await session.refresh(plan)
+            await session.flush()
+            on_commit(session, invalidate_tags, "plans")
             return plan
         return None
 
@@ -49,7 +64,8 @@ class EasybuyService:
         plan = await self.get_plan_by_id(plan_id, session)
         if plan:
             await session.delete(plan)
-            await session.commit()
+            await session.flush()
+            on_commit(session, invalidate_tags, "plans")
             return True
         return False
 
@@ -66,10 +82,10 @@ class EasybuySubscriptionService:
         else:
             raise ValueError("Invalid billing cycle")
 
-    async def get_subscriptions(self, session: AsyncSession, limit: int = 50, offset: int = 0) -> List[EasybuySubscription]:
+    async def get_subscriptions(self, session: AsyncSession, limit: int = 50, offset: int = 0, cursor: Optional[str] = None) -> List[EasybuySubscription]:
         """Retrieve all Easybuy subscriptions with pagination"""
-        statement = select(EasybuySubscription).order_by(
-            desc(EasybuySubscription.created_at)).limit(limit).offset(offset)
+        statement = paginate(
+            select(EasybuySubscription), EasybuySubscription, limit, cursor, offset)
         result = await session.execute(statement)
         return list(result.scalars().all())
 
@@ -118,7 +134,7 @@ class EasybuySubscriptionService:
         )
 
         session.add(subscription)
-        await session.commit()
+        await session.flush()
         new_subscription = await self.get_subscription_by_id(subscription.id, session)
         if not new_subscription:
             return None
@@ -132,7 +148,7 @@ class EasybuySubscriptionService:
                 status_code=404, detail="Subscription not found")
 
         await session.delete(subscription)
-        await session.commit()
+        await session.flush()
         return True
 
     async def update_subscription_status(self, subscription_id: UUID, status: SubscriptionStatus, session: AsyncSession) -> EasybuySubscription:
@@ -143,8 +159,7 @@ class EasybuySubscriptionService:
                 status_code=404, detail="Subscription not found")
 
         subscription.status = status.value
-        await session.commit()
-        await session.refresh(subscription)
+        await session.flush()
         return subscription
 
     async def update_subscription_plan(self, subscription_id: UUID, plan_id: UUID, session: AsyncSession) -> EasybuySubscription:
@@ -164,8 +179,7 @@ class EasybuySubscriptionService:
         subscription.end_date = subscription.start_date + \
             timedelta(days=self.get_subscription_duration(plan))
 
-        await session.commit()
-        await session.refresh(subscription)
+        await session.flush()
         return subscription
 
     async def renew_subscription(self, subscription_id: UUID, session: AsyncSession) -> EasybuySubscription:
@@ -184,24 +198,28 @@ class EasybuySubscriptionService:
         subscription.end_date = datetime.now(
             timezone.utc) + timedelta(days=self.get_subscription_duration(plan))
 
-        await session.commit()
-        await session.refresh(subscription)
+        await session.flush()
         return subscription
 
 
+# Lower bounds of the price facet buckets; the last bucket is open-ended
+PRICE_FACET_BOUNDS = [0, 5000, 20000, 50000, 100000, 500000]
+
+
 class ProductService:
-    async def get_products(self, session: AsyncSession, limit: int = 50, offset: int = 0) -> List[Product]:
+    async def get_products(self, session: AsyncSession, limit: int = 50, offset: int = 0, cursor: Optional[str] = None) -> List[Product]:
         """Retrieve all products with pagination"""
-        statement = select(Product).options(
+        statement = paginate(select(Product).options(
             selectinload(Product.owner)
-        ).order_by(
-            desc(Product.created_at)).limit(limit).offset(offset)
+        ), Product, limit, cursor, offset)
         result = await session.execute(statement)
         return list(result.scalars().all())
 
     async def get_user_products(self, user_id: UUID, session: AsyncSession, limit: int = 50, offset: int = 0) -> List[Product]:
         """Retrieve all products for a specific user with pagination"""
-        statement = select(Product).where(
+        statement = select(Product).options(
+            selectinload(Product.owner)
+        ).where(
             Product.owner_id == user_id).order_by(desc(Product.created_at)).limit(limit).offset(offset)
         result = await session.execute(statement)
         return list(result.scalars().all())
@@ -214,13 +232,23 @@ class ProductService:
         result = await session.execute(statement)
         return result.scalars().first()
 
+    @cached(List[ProductResponse], tags=("products",))
+    async def get_products_cached(self, session: AsyncSession, limit: int = 50, offset: int = 0, cursor: Optional[str] = None) -> List[ProductResponse]:
+        """Read-through cached get_products, for the catalog routes"""
+        return await self.get_products(session, limit, offset, cursor)
+
+    @cached(Optional[ProductResponse], tags=("products",))
+    async def get_product_cached(self, product_id: UUID, session: AsyncSession) -> Optional[ProductResponse]:
+        """Read-through cached get_product_by_id, for the catalog routes"""
+        return await self.get_product_by_id(product_id, session)
+
     async def create_product(self, product_data: ProductCreate, session: AsyncSession) -> Product:
         """Create a new product"""
         product_data_dict = product_data.model_dump()
         new_product = Product(**product_data_dict)
         session.add(new_product)
-        await session.commit()
-        await session.refresh(new_product)
+        await session.flush()
+        on_commit(session, invalidate_tags, "products")
         return new_product
 
     async def update_product(self, product_id: UUID, product_data: ProductCreate, session: AsyncSession) -> Optional[Product]:
@@ -232,8 +260,8 @@ class ProductService:
         for key, value in product_data.model_dump(exclude_unset=True).items():
             setattr(product, key, value)
 
-        await session.commit()
-        await session.refresh(product)
+        await session.flush()
+        on_commit(session, invalidate_tags, "products")
         return product
 
     async def delete_product(self, product_id: UUID, session: AsyncSession) -> bool:
@@ -243,7 +271,8 @@ class ProductService:
             raise HTTPException(status_code=404, detail="Product not found")
 
         await session.delete(product)
-        await session.commit()
+        await session.flush()
+        on_commit(session, invalidate_tags, "products")
         return True
 
     async def search_products(
@@ -253,16 +282,39 @@ class ProductService:
             limit: int = 50,
             offset: int = 0
     ) -> List[Product]:
-        """Search for products by name or description"""
-        if not query:
+        """Search products by name or description, best matches first.
+
+        Full-text matches every word, the last one as a prefix so results
+        follow the user while typing. Only when nothing matches that way is
+        the name matched by trigram similarity, to catch typos, since a short
+        word shares trigrams with a large part of the catalog. Both
+        predicates are served by GIN indexes.
+        """
+        terms = re.findall(r"\w+", query or "")
+        if not terms:
             return []
 
-        # Use a case-insensitive search
-        statement = select(Product).where(
-            (Product.name.ilike(f"%{query}%")) | (
-                Product.description.ilike(f"%{query}%"))
-        ).order_by(desc(Product.created_at)).limit(limit).offset(offset)
+        ts_query = func.to_tsquery("english", " & ".join(terms[:-1] + [f"{terms[-1]}:*"]))
+        full_text = Product.search_vector.bool_op("@@")(ts_query)
+        statement = select(Product).options(
+            selectinload(Product.owner)
+        ).where(full_text).order_by(
+            desc(func.ts_rank_cd(Product.search_vector, ts_query)), desc(Product.created_at)
+        ).limit(limit).offset(offset)
+        products = list((await session.execute(statement)).scalars().all())
+        if products:
+            return products
+        # An empty later page only means the full-text matches ran out
+        if offset and await session.scalar(select(select(Product.id).where(full_text).exists())):
+            return []
 
+        statement = select(Product).options(
+            selectinload(Product.owner)
+        ).where(
+            Product.name.bool_op("%")(query)
+        ).order_by(
+            desc(func.similarity(Product.name, query)), desc(Product.created_at)
+        ).limit(limit).offset(offset)
         result = await session.execute(statement)
         return list(result.scalars().all())
 
@@ -274,12 +326,92 @@ class ProductService:
             offset: int = 0
     ) -> List[Product]:
         """Retrieve products by category with pagination"""
-        statement = select(Product).where(
+        statement = select(Product).options(
+            selectinload(Product.owner)
+        ).where(
             Product.category == category
         ).order_by(desc(Product.created_at)).limit(limit).offset(offset)
         result = await session.execute(statement)
         return list(result.scalars().all())
 
+    def _browse_conditions(self, filters: ProductBrowseFilters) -> list:
+        conditions = []
+        if filters.category:
+            conditions.append(Product.category == filters.category)
+        if filters.tag:
+            conditions.append(Product.tags.contains([filters.tag]))
+        if filters.min_price is not None:
+            conditions.append(Product.price >= filters.min_price)
+        if filters.max_price is not None:
+            conditions.append(Product.price <= filters.max_price)
+        if filters.owner_id:
+            conditions.append(Product.owner_id == filters.owner_id)
+        return conditions
+
+    async def browse_products(
+            self,
+            filters: ProductBrowseFilters,
+            session: AsyncSession,
+            limit: int = 50,
+            cursor: Optional[str] = None
+    ) -> List[Product]:
+        """Retrieve a page of products matching the browse filters"""
+        statement = paginate(
+            select(Product).options(
+                selectinload(Product.owner)
+            ).where(*self._browse_conditions(filters)), Product, limit, cursor)
+        result = await session.execute(statement)
+        return list(result.scalars().all())
+
+    @cached(ProductFacets, tags=("products",), ttl=settings.PRODUCT_FACET_CACHE_TTL)
+    async def get_product_facets(self, filters: ProductBrowseFilters, session: AsyncSession) -> ProductFacets:
+        """Per-facet product counts under the browse filters, cached briefly in Redis"""
+        return await self._count_product_facets(filters, session)
+
+    async def _count_product_facets(self, filters: ProductBrowseFilters, session: AsyncSession) -> ProductFacets:
+        conditions = self._browse_conditions(filters)
+        count = func.count().label("count")
+
+        categories = await session.execute(
+            select(Product.category, count).where(*conditions)
+            .group_by(Product.category).order_by(desc(count))
+        )
+
+        tags = select(func.jsonb_array_elements_text(Product.tags).label("tag")).where(*conditions).subquery()
+        top_tags = await session.execute(
+            select(tags.c.tag, count).group_by(tags.c.tag)
+            .order_by(desc(count)).limit(settings.PRODUCT_FACET_SIZE)
+        )
+
+        owners = await session.execute(
+            select(Product.owner_id, count).where(*conditions)
+            .group_by(Product.owner_id).order_by(desc(count)).limit(settings.PRODUCT_FACET_SIZE)
+        )
+
+        # Every price bucket counted in a single pass
+        buckets = list(zip(PRICE_FACET_BOUNDS, PRICE_FACET_BOUNDS[1:] + [None]))
+        price_counts = (await session.execute(
+            select(*[
+                func.count().filter(
+                    Product.price >= low, *([Product.price < high] if high is not None else [])
+                )
+                for low, high in buckets
+            ]).where(*conditions)
+        )).one()
+
+        return ProductFacets(
+            categories=[
+                FacetCount(value=category.value if category else "uncategorized", count=total)
+                for category, total in categories
+            ],
+            tags=[FacetCount(value=tag, count=total) for tag, total in top_tags],
+            owners=[FacetCount(value=str(owner_id), count=total) for owner_id, total in owners],
+            price_ranges=[
+                FacetCount(value=f"{low}-{high}" if high is not None else f"{low}+", count=total)
+                for (low, high), total in zip(buckets, price_counts)
+            ],
+        )
+
     async def get_product_reviews(
             self, product_id: UUID,
             session: AsyncSession,
@@ -306,6 +438,29 @@ class ProductService:
         result = await session.execute(statement)
         return result.scalars().first()
 
+    async def _adjust_rating(self, product_id: UUID, rating: int, delta: int, session: AsyncSession) -> None:
+        """Add (delta=1) or remove (delta=-1) one rating from the product's aggregates.
+
+        Done as a single UPDATE in the review's transaction, so concurrent
+        reviews never lose counts. Edits and deletes hold the review's row
+        lock, so each old rating is taken off exactly once. Ratings outside 1-5 from before the CHECK
+        constraint are clamped, as the migration that added it clamped them.
+        """
+        rating = min(max(rating, 1), 5)
+        histogram_column = getattr(Product, f"rating_{rating}")
+        await session.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values({
+                Product.rating_count: Product.rating_count + delta,
+                Product.rating_sum: Product.rating_sum + delta * rating,
+                histogram_column: histogram_column + delta,
+                # A new review is not an edit of the product
+                Product.updated_at: Product.updated_at,
+            })
+            .execution_options(synchronize_session=False)
+        )
+
     async def create_product_review(
             self,
             review_data: ProductReviewCreate,
@@ -318,10 +473,10 @@ class ProductService:
 
         review_data_dict = review_data.model_dump()
         new_review = ProductReview(**review_data_dict)
-        print("Creating product review:", new_review)
         session.add(new_review)
-        await session.commit()
-        await session.refresh(new_review)
+        await self._adjust_rating(new_review.product_id, new_review.rating, 1, session)
+        await session.flush()
+        on_commit(session, invalidate_tags, "products")
         return await self.get_product_review_by_id(new_review.id, session)
 
     async def update_product_review(
@@ -331,15 +486,20 @@ class ProductService:
             session: AsyncSession
     ) -> Optional[ProductReview]:
         """Update an existing product review"""
-        review = await session.get(ProductReview, review_id)
+        # Locked, so a concurrent edit or delete can't take the same old rating off the aggregates
+        review = await session.get(ProductReview, review_id, with_for_update=True, populate_existing=True)
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
 
+        old_product_id, old_rating = review.product_id, review.rating
         for key, value in review_data.model_dump(exclude_unset=True).items():
             setattr(review, key, value)
 
-        await session.commit()
-        await session.refresh(review)
+        if (review.product_id, review.rating) != (old_product_id, old_rating):
+            await self._adjust_rating(old_product_id, old_rating, -1, session)
+            await self._adjust_rating(review.product_id, review.rating, 1, session)
+        await session.flush()
+        on_commit(session, invalidate_tags, "products")
         return await self.get_product_review_by_id(review.id, session)
 
     async def delete_product_review(
@@ -348,10 +508,13 @@ class ProductService:
             session: AsyncSession
     ) -> bool:
         """Delete a product review by ID"""
-        review = await session.get(ProductReview, review_id)
+        # Locked: a concurrent delete waits here, then finds the review gone
+        review = await session.get(ProductReview, review_id, with_for_update=True, populate_existing=True)
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
 
         await session.delete(review)
-        await session.commit()
+        await self._adjust_rating(review.product_id, review.rating, -1, session)
+        await session.flush()
+        on_commit(session, invalidate_tags, "products")
         return True
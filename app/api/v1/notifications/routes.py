@@ -1,19 +1,18 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Depends, Response, WebSocket, WebSocketDisconnect, BackgroundTasks, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict
+from typing import List, Dict, Optional
 from uuid import UUID
 
-from app.api.v1.auth.models import User
 from app.api.v1.auth.dependencies import get_current_user
 from app.api.v1.auth.schemas.schemas import UserResponseModel as UserResponse
 from app.api.v1.auth.services.service import ActivityService
-from app.core.database import async_get_db
-from app.core.firebase import send_batch_notification
+from app.core.database import async_get_db, async_get_read_db
+from app.core.pagination import set_next_cursor
 from .schemas import NotificationCreate, NotificationResponse, NotificationUpdate, NotificationUserResponse, RemoveUpdate, NotificationOnlyResponse
 from .service import NotificationService
-from sqlalchemy import select
-# from app.core.websocket import ConnectionManager
-# manager = ConnectionManager()
+from app.api.v1.auth.utils import verify_token
+from app.core.redis import token_in_blocklist
+from app.core.websocket import manager
 
 
 notification_router = APIRouter()
@@ -24,7 +23,7 @@ notification_service = NotificationService()
 async def get_unread_notifications(
     limit: int = 50,
     offset: int = 0,
-    db: AsyncSession = Depends(async_get_db),
+    db: AsyncSession = Depends(async_get_read_db),
     current_user: UserResponse = Depends(get_current_user)
 ):
     """Retrieve unread notifications for the current user."""
@@ -49,7 +48,7 @@ async def mark_as_read(
 async def get_user_sent_notifications(
     limit: int = 50,
     offset: int = 0,
-    db: AsyncSession = Depends(async_get_db),
+    db: AsyncSession = Depends(async_get_read_db),
     current_user: UserResponse = Depends(get_current_user)
 ):
     """Retrieve notifications sent by the current user."""
@@ -60,20 +59,23 @@ async def get_user_sent_notifications(
 
 @notification_router.get("/all", response_model=List[NotificationResponse])
 async def get_all_notifications(
+    response: Response,
     limit: int = 50,
     offset: int = 0,
-    db: AsyncSession = Depends(async_get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(async_get_read_db),
     _: UserResponse = Depends(get_current_user)
 ):
-    """Retrieve all notifications for the current user."""
-    notifications = await notification_service.get_all_notifications(session=db, limit=limit, offset=offset)
+    """Retrieve all notifications for the current user. Follow the X-Next-Cursor header for the next page."""
+    notifications = await notification_service.get_all_notifications(session=db, limit=limit, offset=offset, cursor=cursor)
+    set_next_cursor(response, notifications, limit)
     return notifications
 
 
 @notification_router.get("/{notification_id}", response_model=NotificationResponse)
 async def get_notification(
     notification_id: UUID,
-    db: AsyncSession = Depends(async_get_db),
+    db: AsyncSession = Depends(async_get_read_db),
     _: UserResponse = Depends(get_current_user)
 ):
     """Retrieve a specific notification by ID."""
@@ -101,23 +103,13 @@ async def update_notification(
     if not updated_notification:
         raise HTTPException(status_code=404, detail="Notification not found.")
 
-    user_ids = updated_notification.user_ids
-    stmt = select(User).where(User.id.in_(user_ids)) if user_ids else select(User)
-    result = await db.execute(stmt)
-    users = result.scalars().all()
-
-    users_fcm_tokens = [user.fcm_token for user in users if user.fcm_token]
-    message = {
-        "tokens": users_fcm_tokens,
-        "title": updated_notification.title or "New Notification",
-        "body": updated_notification.message or "",
-        "link": updated_notification.link
-    }
-
-    print(f"Resending notification to tokens: {users_fcm_tokens}")
-    print(f"Notification message: {message}")
-
-    background_tasks.add_task(send_batch_notification, **message)
+    background_tasks.add_task(
+        notification_service.push_to_recipients,
+        user_ids=notification.user_ids,
+        title=updated_notification.title or "New Notification",
+        body=updated_notification.message or "",
+        link=updated_notification.link
+    )
 
     return NotificationUpdate.model_validate(updated_notification)
 
@@ -140,21 +132,24 @@ async def remove_user_from_notification(
         raise HTTPException(status_code=404, detail="Notification or User not found.")
     return True
 
-# @notification_router.websocket("/ws/notifications")
-# async def websocket_endpoint(websocket: WebSocket, user_id: UUID ):
-#     """WebSocket endpoint for real-time notifications."""
-#     await manager.connect(user_id, websocket, "notifications")
-#     try:
-#         while True:
-#             await websocket.receive_text()  # Keep the connection alive
-#     except WebSocketDisconnect:
-#         manager.disconnect(user_id, websocket, "notifications")
-
-
-# async def broadcast_notification(notification: UnreadNotificationResponse):
-#     """Broadcast a notification to all connected users."""
-#     for user in notification.recipients:
-#         await manager.send_notification(user.id, "notifications", notification.model_dump())
+@notification_router.websocket("/ws/notifications")
+async def websocket_endpoint(websocket: WebSocket, token: str):
+    """WebSocket endpoint for real-time notifications. Browsers cannot set headers, so the access token comes as a query param."""
+    token_data = verify_token(token)
+    if not token_data or token_data["refresh"] or await token_in_blocklist(token_data["jti"]):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    user_id = UUID(token_data["user"]["id"])
+    await manager.connect(user_id, websocket, "notifications")
+    try:
+        while True:
+            await websocket.receive_text()  # Keep the connection alive
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Any other error must not leave the socket registered either
+        manager.disconnect(user_id, websocket, "notifications")
 
 
 @notification_router.post("/send_notification", response_model=dict)
@@ -166,38 +161,21 @@ async def create_notification(
 ):
     """Create a new notification and send it to specified users."""
     print(f"Received notification: {notification}")
-    user_ids = notification.user_ids
-    if not user_ids:
-        statement = select(User)
-        result = await db.execute(statement)
-        users = list(result.scalars().all())
-        user_ids = [user.id for user in users]
-    else:
-        # If user_ids are provided, fetch those users' info for the schema
-        statement = select(User).where(User.id.in_(user_ids))
-        result = await db.execute(statement)
-        users = list(result.scalars().all())
-
-    # Store the notification in the DB
+    # Store the notification in the DB; no user_ids broadcasts to every user
     saved_notification = await notification_service.store_notification(
         notification_data=notification,
-        user_ids=user_ids,
+        user_ids=notification.user_ids,
         session=db
     )
 
-    users_fcm_tokens = [user.fcm_token for user in users if user.fcm_token]
-    message = {
-        "tokens": users_fcm_tokens,
-        "title": saved_notification.title,
-        "body": saved_notification.message,
-        "link": saved_notification.link if saved_notification.link else None
-    }
-
-    print(f"Sending notification to tokens: {users_fcm_tokens}")
-    print(f"Notification message: {message}")
-
     # Send notification in the background
-    background_tasks.add_task(send_batch_notification, **message)
+    background_tasks.add_task(
+        notification_service.push_to_recipients,
+        user_ids=notification.user_ids,
+        title=saved_notification.title,
+        body=saved_notification.message,
+        link=saved_notification.link if saved_notification.link else None
+    )
     return {"detail": "Notification sent successfully."}
 
 
@@ -2,16 +2,23 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
 from fastapi import HTTPException
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert
 from uuid import UUID
-from typing import List
+from typing import AsyncIterator, List, Optional
+from app.api.v1.auth.models import User
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, on_commit
+from app.core.pagination import paginate
+from app.core.firebase import dispatch_notification
+from app.core.websocket import manager
 from .models import Notification, NotificationRecipient
 from .schemas import NotificationCreate, NotificationOnlyResponse, NotificationResponse, NotificationUpdate, NotificationUserResponse
-from sqlalchemy import update, desc
+from sqlalchemy import false, literal, update, desc
 
 
 class NotificationService:
-    async def store_notification(self, notification_data: NotificationCreate, user_ids: List[UUID], session: AsyncSession) -> Notification:
-        """Create and store a new notification, and assign recipients."""
+    async def store_notification(self, notification_data: NotificationCreate, user_ids: Optional[List[UUID]], session: AsyncSession) -> Notification:
+        """Create and store a new notification, and assign recipients. No user_ids means every user."""
         notification = Notification(
             sender_id=notification_data.sender_id,
             title=notification_data.title,
@@ -21,20 +28,85 @@ class NotificationService:
         )
 
         session.add(notification)
-        await session.commit()
-        await session.refresh(notification)
-
-        # Create NotificationRecipient records
-        for user_id in user_ids:
-            session.add(NotificationRecipient(
-                notification_id=notification.id,
-                user_id=user_id,
-                is_read=False
-            ))
-
-        await session.commit()
+        await session.flush()
+        await self.add_recipients(notification.id, user_ids, session)
+        on_commit(session, self.publish_to_sockets, self._socket_payload(notification), user_ids)
         return notification
 
+    @staticmethod
+    def _socket_payload(notification: Notification) -> dict:
+        return NotificationOnlyResponse.model_validate(notification, from_attributes=True).model_dump()
+
+    async def publish_to_sockets(self, data: dict, user_ids: Optional[List[UUID]]) -> None:
+        """Push a stored notification to the recipients' open sockets on any worker. No user_ids means every user."""
+        if user_ids:
+            await manager.send_notification_to_users(user_ids, "notifications", data)
+        else:
+            await manager.broadcast("notifications", data)
+
+    async def add_recipients(self, notification_id: UUID, user_ids: Optional[List[UUID]], session: AsyncSession) -> None:
+        """Assign recipients with a single INSERT ... SELECT from users, skipping existing ones."""
+        recipients = select(
+            literal(notification_id, PG_UUID(as_uuid=True)),
+            User.id,
+            false(),
+        )
+        if user_ids:
+            recipients = recipients.where(User.id.in_(user_ids))
+
+        statement = insert(NotificationRecipient).from_select(
+            ["notification_id", "user_id", "is_read"], recipients
+        ).on_conflict_do_nothing()
+        await session.execute(statement)
+
+    async def stream_recipient_fcm_tokens(
+        self,
+        user_ids: Optional[List[UUID]],
+        session: AsyncSession,
+        chunk_size: int = settings.FCM_TOKEN_CHUNK_SIZE
+    ) -> AsyncIterator[List[str]]:
+        """Yield the FCM tokens of the given users (or every user) in chunks, reading only that column."""
+        statement = select(User.fcm_token).where(User.fcm_token.is_not(None))
+        if user_ids:
+            statement = statement.where(User.id.in_(user_ids))
+        result = await session.stream_scalars(
+            statement.execution_options(yield_per=chunk_size)
+        )
+        async for chunk in result.partitions(chunk_size):
+            yield list(chunk)
+
+    async def push_to_recipients(self, user_ids: Optional[List[UUID]], title: str, body: str, link: Optional[str] = None) -> None:
+        """Send a push notification to the recipients chunk by chunk.
+
+        Runs as a background task, after the request's session has been closed,
+        so it opens its own.
+        """
+        async with AsyncSessionLocal() as session:
+            await dispatch_notification(
+                self.stream_recipient_fcm_tokens(user_ids, session), title, body, link,
+                on_dead_tokens=self.clear_dead_fcm_tokens,
+            )
+
+    async def clear_dead_fcm_tokens(self, tokens: List[str]) -> None:
+        """Unset one chunk's unregistered FCM tokens during a broadcast.
+
+        Uses a session of its own: the streaming session keeps its cursor open
+        until the last chunk has been read.
+        """
+        async with AsyncSessionLocal() as session:
+            await self.clear_fcm_tokens(tokens, session)
+            await session.commit()
+
+    async def clear_fcm_tokens(self, tokens: List[str], session: AsyncSession) -> None:
+        """Unset FCM tokens that FCM reported as unregistered, in bulk."""
+        chunk_size = settings.FCM_TOKEN_CHUNK_SIZE
+        for start in range(0, len(tokens), chunk_size):
+            await session.execute(
+                update(User)
+                .where(User.fcm_token.in_(tokens[start:start + chunk_size]))
+                .values(fcm_token=None)
+            )
+
     async def get_unread_notifications(
         self,
         user_id: UUID,
@@ -95,7 +167,7 @@ class NotificationService:
 
         # Step 2: Update is_read
         recipient_assoc.is_read = True
-        await session.commit()
+        await session.flush()
 
         # Step 3: Get the notification
         notification_stmt = select(Notification).filter(
@@ -161,13 +233,14 @@ class NotificationService:
         self,
         session: AsyncSession,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[NotificationResponse]:
         """Retrieve all notifications with recipient user details and read status."""
-        statement = select(Notification).options(
+        statement = paginate(select(Notification).options(
             joinedload(Notification.recipient_associations).joinedload(
                 NotificationRecipient.user)
-        ).order_by(desc(Notification.created_at)).limit(limit).offset(offset)
+        ), Notification, limit, cursor, offset)
 
         result = await session.execute(statement)
         notifications = result.unique().scalars().all()
@@ -252,7 +325,7 @@ class NotificationService:
         if not recipient_assoc:
             return False
         await session.delete(recipient_assoc)
-        await session.commit()
+        await session.flush()
         return True
 
     async def update_notification(
@@ -274,30 +347,13 @@ class NotificationService:
         for key, value in update_data.model_dump(exclude_unset=True).items():
             setattr(notification, key, value)
 
-        await session.commit()
-        await session.refresh(notification)
+        await session.flush()
 
         # update user_ids if provided
         if update_data.user_ids:
-            # Get existing recipient user_ids for this notification
-            existing_recipients_stmt = select(NotificationRecipient.user_id).filter(
-                NotificationRecipient.notification_id == notification_id
-            )
-            existing_result = await session.execute(existing_recipients_stmt)
-            existing_user_ids = set(existing_result.scalars().all())
-            
-            # Find new user_ids that don't already exist
-            new_user_ids = [user_id for user_id in update_data.user_ids if user_id not in existing_user_ids]
-            
-            # Only add new recipients that don't already exist
-            if new_user_ids:
-                for user_id in new_user_ids:
-                    session.add(NotificationRecipient(
-                        notification_id=notification.id,
-                        user_id=user_id,
-                        is_read=False
-                    ))
-                await session.commit()
+            await self.add_recipients(notification.id, update_data.user_ids, session)
+        # Resent to the same users as the push
+        on_commit(session, self.publish_to_sockets, self._socket_payload(notification), update_data.user_ids)
 
         return NotificationUpdate(
             id=notification.id,
@@ -323,5 +379,5 @@ class NotificationService:
             return False
 
         await session.delete(notification)
-        await session.commit()
+        await session.flush()
         return True
\ No newline at end of file
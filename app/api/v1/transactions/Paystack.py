@@ -1,6 +1,19 @@
 from typing import Optional
+import httpx
 from app.core.config import settings
-import requests
+from app.core.http import CircuitBreaker, CircuitOpenError, request_with_retry
+
+
+class PaystackError(Exception):
+    """Raised when Paystack cannot be reached or the circuit breaker is open."""
+
+
+# Shared by every Paystack instance so failures across requests trip it together
+paystack_breaker = CircuitBreaker(
+    failure_threshold=settings.PAYSTACK_BREAKER_THRESHOLD,
+    reset_timeout=settings.PAYSTACK_BREAKER_RESET,
+)
+
 
 class Paystack:
     PAYSTACK_SECRET_KEY = settings.PAYSTACK_SECRET_KEY
@@ -10,23 +23,34 @@ class Paystack:
         "Content-Type": "application/json"
     }
 
-    def verify_payment(self, ref, *args, **kwargs):
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        try:
+            response = await request_with_retry(
+                method, url, paystack_breaker, headers=self.headers, **kwargs
+            )
+        except (CircuitOpenError, httpx.TransportError) as e:
+            raise PaystackError(str(e)) from e
+        if response.status_code >= 500:
+            raise PaystackError(f"Paystack returned {response.status_code}")
+        return response
+
+    async def verify_payment(self, ref, *args, **kwargs):
         url = f"{self.base_url}/transaction/verify/{ref}"
-        response = requests.get(url, headers=self.headers)
+        response = await self._request("GET", url)
         if response.status_code == 200:
             data = response.json()
             return data['status'], data['data']
         data = response.json()
         return data['status'], data['message']
 
-    def get_balance(self):
+    async def get_balance(self):
         url = f"{self.base_url}/balance"
-        response = requests.get(url, headers=self.headers)
+        response = await self._request("GET", url)
         if response.status_code == 200:
             return True, response.json()["data"]
         return False, response.json()
 
-    def create_transfer_recipient(self, name: str, account_number: str, bank_code: str, currency: str = "NGN"):
+    async def create_transfer_recipient(self, name: str, account_number: str, bank_code: str, currency: str = "NGN"):
         url = f"{self.base_url}/transferrecipient"
         payload = {
             "type": "nuban",
@@ -35,12 +59,12 @@ class Paystack:
             "bank_code": bank_code,
             "currency": currency
         }
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = await self._request("POST", url, json=payload)
         if response.status_code == 200 or response.status_code == 201:
             return True, response.json()["data"]
         return False, response.json()
 
-    def initiate_transfer(self, recipient_code: str, amount: int, reason: str = ""):
+    async def initiate_transfer(self, recipient_code: str, amount: int, reason: str = ""):
         url = f"{self.base_url}/transfer"
         payload = {
             "source": "balance",
@@ -48,23 +72,23 @@ class Paystack:
             "recipient": recipient_code,
             "reason": reason
         }
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = await self._request("POST", url, json=payload)
         if response.status_code == 200 or response.status_code == 201:
             return True, response.json()["data"]
         return False, response.json()
 
-    def finalize_transfer(self, transfer_code: str, otp: str):
+    async def finalize_transfer(self, transfer_code: str, otp: str):
         url = f"{self.base_url}/transfer/finalize_transfer"
         payload = {
             "transfer_code": transfer_code,
             "otp": otp
         }
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = await self._request("POST", url, json=payload)
         if response.status_code == 200:
             return True, response.json()["data"]
         return False, response.json()
 
-    def get_payout_history(self, status: Optional[str] = None, from_date: Optional[str] = None, to_date: Optional[str] = None):
+    async def get_payout_history(self, status: Optional[str] = None, from_date: Optional[str] = None, to_date: Optional[str] = None):
         url = f"{self.base_url}/settlement"
         params = {}
         if status:
@@ -73,12 +97,12 @@ class Paystack:
             params["from"] = from_date
         if to_date:
             params["to"] = to_date
-        response = requests.get(url, headers=self.headers, params=params)
+        response = await self._request("GET", url, params=params)
         if response.status_code == 200:
             return True, response.json()["data"]
         return False, response.json()
 
-    def create_customer(self, email: str, first_name: str, last_name: str, phone: str):
+    async def create_customer(self, email: str, first_name: str, last_name: str, phone: str):
         url = f"{self.base_url}/customer"
         payload = {
             "email": email,
@@ -86,18 +110,18 @@ class Paystack:
             "last_name": last_name,
             "phone": phone
         }
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = await self._request("POST", url, json=payload)
         if response.status_code == 200 or response.status_code == 201:
             return True, response.json()["data"]
         return False, response.json()
 
-    def create_virtual_account(self, customer_code: str, preferred_bank: str = "test-bank"):
+    async def create_virtual_account(self, customer_code: str, preferred_bank: str = "test-bank"):
         url = f"{self.base_url}/dedicated_account"
         payload = {
             "customer": customer_code,
             "preferred_bank": preferred_bank
         }
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = await self._request("POST", url, json=payload)
         if response.status_code == 200 or response.status_code == 201:
             return True, response.json()["data"]
         return False, response.json()
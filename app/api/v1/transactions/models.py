@@ -4,7 +4,7 @@ from enum import Enum
 from datetime import datetime, timezone
 import uuid
 
-from sqlalchemy import String, Numeric, ForeignKey, DateTime, JSON
+from sqlalchemy import String, Numeric, ForeignKey, DateTime, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -36,6 +36,11 @@ class WalletType(str, Enum):
     EURO = "euro"
 
 
+class LedgerAccount(str, Enum):
+    WALLET = "wallet"
+    EXTERNAL = "external"  # Money entering or leaving the platform (top-ups, payments)
+
+
 class Wallet(Base):
     __tablename__ = "wallets"
 
@@ -43,6 +48,8 @@ class Wallet(Base):
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     wallet_type: Mapped[str] = mapped_column(String(20), default=WalletType.NAIRA.value)
     balance: Mapped[Decimal] = mapped_column(Numeric(10, 2), default=0.00)
+    # NULL for wallets created before this column existed
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, default=lambda: datetime.now(timezone.utc))
 
     user: Mapped["User"] = relationship("User", back_populates="wallets")
     transactions: Mapped[List["Transaction"]] = relationship("Transaction", back_populates="wallet", passive_deletes=True)
@@ -62,6 +69,10 @@ class Wallet(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_created_at_id", "created_at", "id"),
+        Index("ix_transactions_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
@@ -79,3 +90,28 @@ class Transaction(Base):
     def generate_payment_ref(self):
         self.reference = f"Payment--{uuid.uuid4().hex[:11]}"
         return self
+
+
+class LedgerEntry(Base):
+    """Append-only journal of wallet movements. The legs of a journal sum to zero."""
+    __tablename__ = "ledger_entries"
+    __table_args__ = (
+        Index("ix_ledger_entries_wallet_id_created_at", "wallet_id", "created_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    journal_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), index=True)
+    account: Mapped[str] = mapped_column(String(20))
+    wallet_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("wallets.id", ondelete="SET NULL"))
+    transaction_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("transactions.id", ondelete="SET NULL"))
+    amount: Mapped[Decimal] = mapped_column(Numeric(12, 2))  # Signed: credits positive, debits negative
+    balance_after: Mapped[Optional[Decimal]] = mapped_column(Numeric(10, 2))  # Wallet legs only
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class WalletBalanceSnapshot(Base):
+    __tablename__ = "wallet_balance_snapshots"
+
+    wallet_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("wallets.id", ondelete="CASCADE"), primary_key=True)
+    taken_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    balance: Mapped[Decimal] = mapped_column(Numeric(10, 2))
@@ -1,13 +1,23 @@
+import csv
+import io
+import json
 from hmac import new
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.v1.auth.dependencies import get_current_user
+from app.api.v1.auth.dependencies import RoleChecker, get_current_user
+from app.api.v1.auth.errors import raise_insufficient_permission_exception
 from app.api.v1.auth.schemas.schemas import UserResponseModel as UserResponse
 from app.api.v1.auth.services.service import ActivityService
-from app.api.v1.transactions.schemas import TransactionCreate, TransactionResponse, WalletCreate, WalletResponse, WalletUpdate
-from app.api.v1.transactions.service import WalletService, TransactionService
-from app.core.database import async_get_db
-from typing import List, Optional
+from app.api.v1.transactions.models import TransactionStatus
+from app.api.v1.transactions.Paystack import PaystackError
+from app.api.v1.transactions.schemas import TransactionCreate, TransactionResponse, WalletBalanceResponse, WalletCreate, WalletResponse, WalletUpdate
+from app.api.v1.transactions.service import TRANSACTION_EXPORT_COLUMNS, WalletService, TransactionService
+from app.api.v1.transactions.webhooks import enqueue_paystack_event, verify_paystack_signature
+from app.core.database import async_get_db, async_get_read_db
+from app.core.pagination import decode_cursor, set_next_cursor
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
 from uuid import UUID
 
 wallet_router = APIRouter()
@@ -61,6 +71,28 @@ async def get_wallet(
     return wallet
 
 
+@wallet_router.get("/{wallet_id}/balance", response_model=WalletBalanceResponse, status_code=status.HTTP_200_OK)
+async def get_wallet_balance_at(
+    wallet_id: UUID,
+    at: Optional[datetime] = None,
+    current_user: UserResponse = Depends(get_current_user),
+    session: AsyncSession = Depends(async_get_db)
+):
+    """Get a wallet's balance at a point in time (defaults to now); owners and admins only"""
+    wallet = await wallet_service.get_wallet_by_id(wallet_id=wallet_id, session=session)
+    if not wallet:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found")
+    if wallet.user_id != current_user.id and current_user.role != "admin":
+        raise raise_insufficient_permission_exception()
+    at = at or datetime.now(timezone.utc)
+    balance = await wallet_service.get_balance_at(wallet_id=wallet_id, at=at, session=session)
+    if balance is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Wallet did not exist at that time")
+    return WalletBalanceResponse(wallet_id=wallet_id, balance=balance, at=at)
+
+
 @wallet_router.delete("/{wallet_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_wallet(
     wallet_id: UUID,
@@ -170,7 +202,7 @@ async def create_transaction(
         if not transaction.wallet_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Wallet ID is required for this transaction type")
-        wallet = await wallet_service.withdraw(wallet_id=transaction.wallet_id, amount=transaction.amount, session=session)
+        wallet = await wallet_service.withdraw(wallet_id=transaction.wallet_id, amount=transaction.amount, session=session, transaction_id=transaction.id)
         if not wallet:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds")
@@ -187,23 +219,83 @@ async def create_transaction(
 
 @transaction_router.get("/admin", response_model=List[TransactionResponse], status_code=status.HTTP_200_OK)
 async def get_all_transactions(
-    session: AsyncSession = Depends(async_get_db),
+    response: Response,
+    session: AsyncSession = Depends(async_get_read_db),
     _: UserResponse = Depends(get_current_user),
     Limit: int = 100,
-    Offset: int = 0
+    Offset: int = 0,
+    cursor: Optional[str] = None
 ):
-    """Get all transactions for admin"""
-    transactions = await transaction_service.get_all_transactions(session=session, limit=Limit, offset=Offset)
+    """Get all transactions for admin; follow the X-Next-Cursor header for the next page"""
+    transactions = await transaction_service.get_all_transactions(session=session, limit=Limit, offset=Offset, cursor=cursor)
+    set_next_cursor(response, transactions, Limit)
     return transactions
 
 
+@transaction_router.get("/admin/export", status_code=status.HTTP_200_OK, dependencies=[Depends(RoleChecker(["admin"]))])
+async def export_transactions(
+    format: Literal["csv", "ndjson"] = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    transaction_status: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+):
+    """Stream every transaction matching the filters as CSV or NDJSON (admin only)"""
+    column_names = [column.key for column in TRANSACTION_EXPORT_COLUMNS]
+    batches = transaction_service.stream_export_rows(
+        start=start, end=end, status=transaction_status, transaction_type=transaction_type)
+
+    async def csv_chunks():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(column_names)
+        async for rows in batches:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    async def ndjson_chunks():
+        async for rows in batches:
+            yield "".join(json.dumps(dict(zip(column_names, row)), default=str) + "\n" for row in rows)
+
+    if format == "csv":
+        body, media_type = csv_chunks(), "text/csv"
+    else:
+        body, media_type = ndjson_chunks(), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=transactions.{format}"},
+    )
+
+
 @transaction_router.get("/", response_model=List[TransactionResponse], status_code=status.HTTP_200_OK)
 async def get_transactions(
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    stream: bool = False,
     current_user: UserResponse = Depends(get_current_user),
-    session: AsyncSession = Depends(async_get_db)
+    session: AsyncSession = Depends(async_get_read_db)
 ):
-    """Get all transactions for a user"""
-    transactions = await transaction_service.get_transactions(user_id=current_user.id, session=session)
+    """Get a page of a user's transactions; follow the X-Next-Cursor header for the next page.
+
+    With stream=true, every transaction from the cursor on is streamed as NDJSON instead.
+    """
+    if stream:
+        if cursor:
+            decode_cursor(cursor)  # Reject a bad cursor with a 400 before the stream starts
+
+        async def ndjson_rows():
+            async for transaction in transaction_service.stream_transactions(user_id=current_user.id, cursor=cursor):
+                yield TransactionResponse.model_validate(transaction).model_dump_json() + "\n"
+
+        return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson")
+
+    transactions = await transaction_service.get_transactions(user_id=current_user.id, session=session, limit=limit, cursor=cursor)
+    set_next_cursor(response, transactions, limit)
     return transactions
 
 
@@ -241,6 +333,17 @@ async def delete_transaction(
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+@transaction_router.post("/webhook/paystack", status_code=status.HTTP_200_OK)
+async def paystack_webhook(request: Request):
+    """Receive a signed Paystack event and queue it for settlement"""
+    body = await request.body()
+    if not verify_paystack_signature(body, request.headers.get("x-paystack-signature")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature")
+    await enqueue_paystack_event(body)
+    return {"status": "queued"}
+
+
 @transaction_router.get("/verify/{transaction_ref}", response_model=TransactionResponse, status_code=status.HTTP_200_OK)
 async def verify_transaction(
     transaction_ref: str,
@@ -248,15 +351,33 @@ async def verify_transaction(
     session: AsyncSession = Depends(async_get_db)
 ):
     """Verify a transaction by reference"""
-    transaction = await transaction_service.verify_transaction(reference=transaction_ref, session=session)
+    transaction = await transaction_service.get_transaction_by_reference(reference=transaction_ref, session=session)
     if not transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+    # Usually already settled by the Paystack webhook; nothing left to do
+    if transaction.status == TransactionStatus.SUCCESS.value:
+        return transaction
+    # Nothing for this route to move; the Paystack webhook settles wallet-less payments on its own
     if not transaction.wallet_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Wallet ID is required for this transaction type")
+
+    try:
+        settled = await transaction_service.verify_transaction(reference=transaction_ref, session=session)
+    except PaystackError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Payment provider is unavailable, please try again shortly")
+    if not settled:
+        # Either unpaid, or the webhook settled it while we were asking Paystack
+        await session.refresh(transaction)
+        if transaction.status == TransactionStatus.SUCCESS.value:
+            return transaction
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+    transaction = settled
     if transaction.transaction_type == "topup":
-        wallet = await wallet_service.deposit(wallet_id=transaction.wallet_id, amount=transaction.amount, session=session)
+        wallet = await wallet_service.deposit(wallet_id=transaction.wallet_id, amount=transaction.amount, session=session, transaction_id=transaction.id)
         if not wallet:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Wallet deposit failed")
@@ -267,7 +388,7 @@ async def verify_transaction(
             session=session
         )
     elif transaction.transaction_type in ["subscription", "exchange"]:
-        wallet = await wallet_service.withdraw(wallet_id=transaction.wallet_id, amount=transaction.amount, session=session)
+        wallet = await wallet_service.withdraw(wallet_id=transaction.wallet_id, amount=transaction.amount, session=session, transaction_id=transaction.id)
         if not wallet:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds")
@@ -277,5 +398,5 @@ async def verify_transaction(
             description=f"Withdrew {transaction.amount} from wallet ID: {transaction.wallet_id}",
             session=session
         )
-    
+
     return transaction
@@ -42,6 +42,17 @@ class WalletResponse(WalletBase):
         return str(value)
     
 
+class WalletBalanceResponse(BaseModel):
+    """Schema for a wallet's balance at a point in time"""
+    wallet_id: UUID4
+    balance: float
+    at: datetime
+
+    @field_serializer("wallet_id")
+    def serialize_uuid(self, value: UUID4) -> str:
+        return str(value)
+
+
 # Transaction schemas
 
 class TransactionBase(BaseModel):
@@ -1,11 +1,18 @@
-from typing import List, Optional
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, List, Optional, Sequence
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.api.v1.transactions.Paystack import Paystack
 from app.api.v1.transactions.schemas import TransactionCreate, WalletCreate
-from .models import Transaction, TransactionStatus, Wallet
-from sqlalchemy import desc
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.pagination import paginate
+from .models import LedgerAccount, LedgerEntry, Transaction, TransactionStatus, Wallet, WalletBalanceSnapshot
+from sqlalchemy import desc, func, update
 
 
 class WalletService:
@@ -13,8 +20,7 @@ class WalletService:
         wallet_data_dict = wallet_data.model_dump()
         new_wallet = Wallet(**wallet_data_dict)
         session.add(new_wallet)
-        await session.commit()
-        await session.refresh(new_wallet)
+        await session.flush()
         return new_wallet
 
     async def get_wallets(self, user_id: UUID, session: AsyncSession) -> List[Wallet]:
@@ -33,32 +39,130 @@ class WalletService:
         result = await session.execute(statement)
         return result.scalars().first()
 
-    async def withdraw(self, wallet_id: UUID, amount: float, session: AsyncSession) -> Optional[Wallet]:
-        wallet = await self.get_wallet_by_id(wallet_id, session)
-        if wallet and wallet.withdraw(amount):
-            await session.commit()
-            await session.refresh(wallet)
-            return wallet
-        return None
+    async def _apply_balance_change(
+        self,
+        wallet_id: UUID,
+        amount: Decimal,
+        session: AsyncSession,
+        transaction_id: Optional[UUID] = None,
+        counter_account: LedgerAccount = LedgerAccount.EXTERNAL
+    ) -> Optional[Wallet]:
+        # One conditional UPDATE ... RETURNING: no read-modify-write window, and
+        # any copy of the wallet already in the session is refreshed from the row
+        statement = (
+            update(Wallet)
+            .where(Wallet.id == wallet_id)
+            .values(balance=Wallet.balance + amount)
+            .returning(Wallet)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        if amount < 0:
+            statement = statement.where(Wallet.balance >= -amount)
+        result = await session.execute(statement)
+        wallet = result.scalars().first()
+        if wallet is None:
+            return None
 
-    async def deposit(self, wallet_id: UUID, amount: float, session: AsyncSession) -> Optional[Wallet]:
-        wallet = await self.get_wallet_by_id(wallet_id, session)
-        if wallet:
-            wallet.deposit(amount)
-            await session.commit()
-            await session.refresh(wallet)
-            return wallet
-        return None
+        # Journal the movement in the same transaction. The wallet row stays
+        # locked until commit, so created_at orders each wallet's entries.
+        journal_id = uuid.uuid4()
+        created_at = datetime.now(timezone.utc)
+        session.add_all([
+            LedgerEntry(
+                journal_id=journal_id,
+                account=LedgerAccount.WALLET.value,
+                wallet_id=wallet.id,
+                transaction_id=transaction_id,
+                amount=amount,
+                balance_after=wallet.balance,
+                created_at=created_at,
+            ),
+            LedgerEntry(
+                journal_id=journal_id,
+                account=counter_account.value,
+                transaction_id=transaction_id,
+                amount=-amount,
+                created_at=created_at,
+            ),
+        ])
+        await session.flush()
+        return wallet
+
+    async def withdraw(self, wallet_id: UUID, amount: float, session: AsyncSession, transaction_id: Optional[UUID] = None) -> Optional[Wallet]:
+        """Debit the wallet if it holds at least amount. Returns None if it does not exist or is short."""
+        return await self._apply_balance_change(
+            wallet_id, -Decimal(str(amount)), session, transaction_id=transaction_id
+        )
+
+    async def deposit(self, wallet_id: UUID, amount: float, session: AsyncSession, transaction_id: Optional[UUID] = None) -> Optional[Wallet]:
+        return await self._apply_balance_change(
+            wallet_id, Decimal(str(amount)), session, transaction_id=transaction_id
+        )
+
+    async def get_balance_at(self, wallet_id: UUID, at: datetime, session: AsyncSession) -> Optional[Decimal]:
+        """Balance of a wallet at a point in time, from the ledger or, before the ledger, the latest snapshot.
+
+        Returns None if the wallet does not exist or was created after `at`.
+        """
+        statement = select(LedgerEntry.balance_after).where(
+            LedgerEntry.wallet_id == wallet_id,
+            LedgerEntry.account == LedgerAccount.WALLET.value,
+            LedgerEntry.created_at <= at
+        ).order_by(desc(LedgerEntry.created_at)).limit(1)
+        balance = (await session.execute(statement)).scalar()
+        if balance is not None:
+            return balance
+
+        statement = select(WalletBalanceSnapshot.balance).where(
+            WalletBalanceSnapshot.wallet_id == wallet_id,
+            WalletBalanceSnapshot.taken_at <= at
+        ).order_by(desc(WalletBalanceSnapshot.taken_at)).limit(1)
+        balance = (await session.execute(statement)).scalar()
+        if balance is not None:
+            return balance
+
+        # Nothing recorded up to `at`: the balance then is whatever the first
+        # later movement started from, or the current balance if it never moved
+        wallet = await session.get(Wallet, wallet_id)
+        if wallet is None or (wallet.created_at is not None and at < wallet.created_at):
+            return None
+        statement = select(LedgerEntry.balance_after - LedgerEntry.amount).where(
+            LedgerEntry.wallet_id == wallet_id,
+            LedgerEntry.account == LedgerAccount.WALLET.value,
+            LedgerEntry.created_at > at
+        ).order_by(LedgerEntry.created_at).limit(1)
+        balance = (await session.execute(statement)).scalar()
+        return wallet.balance if balance is None else balance
+
+    async def snapshot_balances(self, session: AsyncSession) -> None:
+        """Record every wallet's current balance in one INSERT ... SELECT."""
+        statement = insert(WalletBalanceSnapshot).from_select(
+            ["wallet_id", "balance", "taken_at"],
+            select(Wallet.id, Wallet.balance, func.now())
+        ).on_conflict_do_nothing()
+        await session.execute(statement)
 
     async def delete_wallet(self, wallet_id: UUID, session: AsyncSession) -> bool:
         wallet = await self.get_wallet_by_id(wallet_id, session)
         if wallet:
             await session.delete(wallet)
-            await session.commit()
+            await session.flush()
             return True
         return False
 
 
+TRANSACTION_EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.reference,
+    Transaction.user_id,
+    Transaction.wallet_id,
+    Transaction.transaction_type,
+    Transaction.amount,
+    Transaction.status,
+    Transaction.created_at,
+)
+
+
 class TransactionService:
     async def get_transaction_by_id(self, transaction_id: UUID, session: AsyncSession) -> Transaction:
         statement = select(Transaction).where(Transaction.id == transaction_id)
@@ -71,41 +175,112 @@ class TransactionService:
         result = await session.execute(statement)
         return result.scalars().first()
 
-    async def get_all_transactions(self, session: AsyncSession, limit: int = 100, offset: int = 0) -> List[Transaction]:
-        statement = select(Transaction).order_by(desc(Transaction.created_at)).limit(limit).offset(offset)
+    async def get_all_transactions(self, session: AsyncSession, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> List[Transaction]:
+        statement = paginate(select(Transaction), Transaction, limit, cursor, offset)
         result = await session.execute(statement)
         return list(result.scalars().all())
 
-    async def get_transactions(self, user_id: UUID, session: AsyncSession) -> List[Transaction]:
-        statement = select(Transaction).where(Transaction.user_id == user_id).order_by(desc(Transaction.created_at))
+    async def get_transactions(self, user_id: UUID, session: AsyncSession, limit: int = 100, cursor: Optional[str] = None) -> List[Transaction]:
+        statement = paginate(
+            select(Transaction).where(Transaction.user_id == user_id), Transaction, limit, cursor)
         result = await session.execute(statement)
         return list(result.scalars().all())
 
+    async def stream_transactions(self, user_id: UUID, cursor: Optional[str] = None) -> AsyncIterator[Transaction]:
+        """Yield a user's transactions newest first, holding one batch in memory at a time.
+
+        Meant for StreamingResponse bodies, which outlive the request's
+        session, so it opens its own.
+        """
+        statement = paginate(
+            select(Transaction).where(Transaction.user_id == user_id), Transaction, None, cursor)
+        async with AsyncSessionLocal() as session:
+            result = await session.stream_scalars(
+                statement.execution_options(yield_per=settings.STREAM_BATCH_SIZE)
+            )
+            async for transaction in result:
+                yield transaction
+                # Let go of rows already written out
+                session.expunge(transaction)
+
+    async def stream_export_rows(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        status: Optional[str] = None,
+        transaction_type: Optional[str] = None
+    ) -> AsyncIterator[Sequence[Any]]:
+        """Yield batches of plain column tuples for an export, oldest first.
+
+        Reads through a server-side cursor and never builds ORM objects. Opens
+        its own session because it feeds a StreamingResponse.
+        """
+        statement = select(*TRANSACTION_EXPORT_COLUMNS).order_by(Transaction.created_at, Transaction.id)
+        if start:
+            statement = statement.where(Transaction.created_at >= start)
+        if end:
+            statement = statement.where(Transaction.created_at < end)
+        if status:
+            statement = statement.where(Transaction.status == status)
+        if transaction_type:
+            statement = statement.where(Transaction.transaction_type == transaction_type)
+
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                statement.execution_options(yield_per=settings.STREAM_BATCH_SIZE)
+            )
+            async for rows in result.partitions():
+                yield rows
+
     async def create_transaction(self, transaction_data: TransactionCreate, session: AsyncSession) -> Transaction:
         transaction_data_dict = transaction_data.model_dump()
         new_transaction = Transaction(**transaction_data_dict)
         new_transaction.generate_payment_ref()
         session.add(new_transaction)
-        await session.commit()
-        await session.refresh(new_transaction)
+        await session.flush()
         return new_transaction
 
+    async def settle_transaction(self, reference: str, session: AsyncSession, amount: Optional[Decimal] = None) -> Optional[Transaction]:
+        """Mark a pending transaction successful, without committing.
+
+        Returns the transaction only to the caller whose conditional UPDATE
+        made the change, so the webhook and the verify route never both apply
+        its wallet movement.
+        """
+        statement = (
+            update(Transaction)
+            .where(
+                Transaction.reference == reference,
+                Transaction.status == TransactionStatus.PENDING.value
+            )
+            .values(status=TransactionStatus.SUCCESS.value)
+            .returning(Transaction)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        if amount is not None:
+            statement = statement.where(Transaction.amount == amount)
+        result = await session.execute(statement)
+        return result.scalars().first()
+
     async def verify_transaction(self, reference: str, session: AsyncSession) -> Optional[Transaction]:
+        """Confirm a payment with Paystack and settle it; returns the transaction if this call settled it."""
         paystack = Paystack()
-        status, data = paystack.verify_payment(reference)
-        if status:
-            transaction = await self.get_transaction_by_reference(reference, session)
-            if transaction:
-                transaction.status = TransactionStatus.SUCCESS
-                await session.commit()
-                await session.refresh(transaction)
-                return transaction
+        status, data = await paystack.verify_payment(reference)
+        if status and data.get("status") == "success":
+            return await self.settle_transaction(reference, session)
         return None
 
     async def delete_transaction(self, transaction_id: UUID, session: AsyncSession) -> bool:
         transaction = await self.get_transaction_by_id(transaction_id, session)
         if transaction:
             await session.delete(transaction)
-            await session.commit()
+            await session.flush()
             return True
         return False
+
+
+async def snapshot_wallet_balances() -> None:
+    """Scheduled job: snapshot wallet balances on a session of its own."""
+    async with AsyncSessionLocal() as session:
+        await WalletService().snapshot_balances(session)
+        await session.commit()
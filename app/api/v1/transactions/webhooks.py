@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+from decimal import Decimal
+from redis.exceptions import ResponseError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.v1.auth.services.service import ActivityService
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, run_on_commit
+from app.core.redis import redis_client
+from .models import TransactionType
+from .service import TransactionService, WalletService
+
+PAYSTACK_EVENTS_STREAM = "paystack:events"
+PAYSTACK_EVENTS_GROUP = "wallet-settlement"
+PAYSTACK_EVENTS_MAXLEN = 100000
+# Events that could not be parsed or kept failing, kept for inspection and manual replay
+PAYSTACK_DEAD_LETTER_STREAM = "paystack:events:dead"
+
+wallet_service = WalletService()
+transaction_service = TransactionService()
+activity_service = ActivityService()
+
+
+def verify_paystack_signature(body: bytes, signature: str | None) -> bool:
+    """Paystack signs the raw body with HMAC-SHA512 of the secret key."""
+    if not signature:
+        return False
+    expected = hmac.new(
+        settings.PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512
+    ).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+async def enqueue_paystack_event(body: bytes) -> None:
+    await redis_client.xadd(
+        PAYSTACK_EVENTS_STREAM,
+        {"payload": body.decode()},
+        maxlen=PAYSTACK_EVENTS_MAXLEN,
+        approximate=True,
+    )
+
+
+async def process_paystack_event(event: dict, session: AsyncSession) -> None:
+    """Apply a Paystack event. Safe to run more than once for the same event."""
+    if event.get("event") != "charge.success":
+        return
+
+    data = event["data"]
+    # Paystack amounts are in kobo
+    amount = Decimal(data["amount"]) / 100
+    transaction = await transaction_service.settle_transaction(
+        data["reference"], session, amount=amount
+    )
+    if transaction is None:
+        # Unknown reference, amount mismatch, or already settled
+        return
+
+    wallet = None
+    if transaction.wallet_id and transaction.transaction_type == TransactionType.TOPUP.value:
+        wallet = await wallet_service.deposit(
+            transaction.wallet_id, transaction.amount, session, transaction_id=transaction.id
+        )
+        description = f"Deposited {transaction.amount} to wallet ID: {transaction.wallet_id}"
+    elif transaction.wallet_id and transaction.transaction_type in (
+        TransactionType.SUBSCRIPTION.value, TransactionType.EXCHANGE.value
+    ):
+        wallet = await wallet_service.withdraw(
+            transaction.wallet_id, transaction.amount, session, transaction_id=transaction.id
+        )
+        description = f"Withdrew {transaction.amount} from wallet ID: {transaction.wallet_id}"
+    else:
+        await session.commit()
+        return
+
+    if wallet is None:
+        # Leave the transaction pending so the verify route can settle it later
+        await session.rollback()
+        logging.warning("Could not apply wallet movement for transaction %s", transaction.reference)
+        return
+
+    await activity_service.create_user_activity(
+        user_id=transaction.user_id,
+        activity_type="create",
+        description=description,
+        session=session
+    )
+    await session.commit()
+    await run_on_commit(session)
+
+
+async def _dead_letter(message_id: str, fields: dict, reason: str) -> None:
+    """Move an event to the dead-letter stream and acknowledge it, atomically."""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.xadd(
+            PAYSTACK_DEAD_LETTER_STREAM,
+            {**fields, "message_id": message_id, "reason": reason},
+            maxlen=PAYSTACK_EVENTS_MAXLEN,
+            approximate=True,
+        )
+        pipe.xack(PAYSTACK_EVENTS_STREAM, PAYSTACK_EVENTS_GROUP, message_id)
+        await pipe.execute()
+    logging.error("Paystack event %s moved to %s: %s", message_id, PAYSTACK_DEAD_LETTER_STREAM, reason)
+
+
+async def _delivery_count(message_id: str) -> int:
+    pending = await redis_client.xpending_range(
+        PAYSTACK_EVENTS_STREAM, PAYSTACK_EVENTS_GROUP, min=message_id, max=message_id, count=1
+    )
+    return pending[0]["times_delivered"] if pending else 0
+
+
+async def _handle_entries(entries) -> None:
+    for message_id, fields in entries:
+        try:
+            event = json.loads(fields["payload"])
+        except (KeyError, TypeError, ValueError) as e:
+            # Retrying can't fix a malformed event
+            await _dead_letter(message_id, fields, f"unparseable: {e!r}")
+            continue
+        try:
+            async with AsyncSessionLocal() as session:
+                await process_paystack_event(event, session)
+        except Exception as e:
+            logging.exception("Failed to process Paystack event %s", message_id)
+            if await _delivery_count(message_id) >= settings.PAYSTACK_EVENT_MAX_DELIVERIES:
+                await _dead_letter(message_id, fields, f"failed {settings.PAYSTACK_EVENT_MAX_DELIVERIES} times: {e!r}")
+            # Otherwise left unacknowledged; reclaimed and retried after PAYSTACK_EVENT_RETRY_AFTER
+            continue
+        await redis_client.xack(PAYSTACK_EVENTS_STREAM, PAYSTACK_EVENTS_GROUP, message_id)
+
+
+async def consume_paystack_events() -> None:
+    """Settle queued Paystack events for the lifetime of the app. Every worker
+    joins one consumer group, so each event is handled by one of them.
+    """
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    while True:
+        try:
+            try:
+                await redis_client.xgroup_create(
+                    PAYSTACK_EVENTS_STREAM, PAYSTACK_EVENTS_GROUP, id="0", mkstream=True
+                )
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+            while True:
+                # Pick up events a crashed or stuck consumer never acknowledged
+                _, claimed, *_ = await redis_client.xautoclaim(
+                    PAYSTACK_EVENTS_STREAM, PAYSTACK_EVENTS_GROUP, consumer,
+                    min_idle_time=settings.PAYSTACK_EVENT_RETRY_AFTER * 1000, count=10
+                )
+                await _handle_entries(claimed)
+
+                streams = await redis_client.xreadgroup(
+                    PAYSTACK_EVENTS_GROUP, consumer, {PAYSTACK_EVENTS_STREAM: ">"},
+                    count=10, block=5000
+                )
+                for _, entries in streams:
+                    await _handle_entries(entries)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning("Paystack event consumer lost Redis, retrying: %s", e)
+            await asyncio.sleep(5)
@@ -0,0 +1,208 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Iterable, Optional
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import AsyncSessionLocal
+from .redis import redis_client, release_lock
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; `ttl` overrides the cache default for this entry."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches `predicate`; returns the count."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# -------------------------------------------------------
+# shared Redis read-through cache
+# -------------------------------------------------------
+
+# Counters for the metrics endpoint
+cache_stats = {"hits": 0, "misses": 0, "errors": 0}
+
+def _tag_key(tag: str) -> str:
+    return f"cache:tag:{tag}"
+
+
+def _cache_key(name: str, versions: list, args: tuple, kwargs: dict) -> str:
+    # Sessions differ on every call and say nothing about the result
+    args = [a for a in args if not isinstance(a, AsyncSession)]
+    kwargs = {k: v for k, v in sorted(kwargs.items()) if not isinstance(v, AsyncSession)}
+    digest = hashlib.sha256(repr((args, kwargs)).encode()).hexdigest()
+    version = ".".join(str(v or 0) for v in versions)
+    return f"cache:{name}:{version}:{digest}"
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """Drop every cached entry under the given tags.
+
+    Each tag carries a version number that is part of every key cached under
+    it; bumping the version orphans the old entries, which then expire on
+    their TTL.
+    """
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(_tag_key(tag))
+            await pipe.execute()
+    except Exception as e:
+        cache_stats["errors"] += 1
+        logging.warning("Cache invalidation failed for %s: %s", tags, e)
+
+
+def _is_replica(value: Any) -> bool:
+    return isinstance(value, AsyncSession) and bool(value.info.get("read_only"))
+
+
+async def _wait_for(key: str) -> Optional[str]:
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        try:
+            stored = await redis_client.get(key)
+        except Exception:
+            return None
+        if stored is not None:
+            return stored
+    return None
+
+
+def cached(response_type: Any, tags: Iterable[str], ttl: Optional[int] = None) -> Callable:
+    """Read-through Redis cache for an async service method.
+
+    The result is validated into `response_type` and stored as JSON, so hits
+    and misses both return the response model rather than ORM objects. Only
+    one caller per key queries the database on a miss; the rest wait for its
+    result. Redis failures fall back to calling the method directly.
+
+    Misses always load from the primary, even when the caller holds a
+    replica session: a lagging replica would otherwise store pre-write rows
+    under the version the write just bumped, and serve them to the writer.
+    """
+    adapter = TypeAdapter(response_type)
+    tags = tuple(tags)
+
+    def decorator(func: Callable) -> Callable:
+        name = func.__qualname__
+
+        async def load(args, kwargs):
+            if not any(_is_replica(value) for value in (*args, *kwargs.values())):
+                return adapter.validate_python(await func(*args, **kwargs), from_attributes=True)
+            async with AsyncSessionLocal() as primary:
+                args = tuple(primary if _is_replica(value) else value for value in args)
+                kwargs = {key: primary if _is_replica(value) else value for key, value in kwargs.items()}
+                return adapter.validate_python(await func(*args, **kwargs), from_attributes=True)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                versions = await redis_client.mget([_tag_key(tag) for tag in tags])
+                key = _cache_key(name, versions, args[1:], kwargs)
+                stored = await redis_client.get(key)
+            except Exception as e:
+                cache_stats["errors"] += 1
+                logging.warning("Cache read failed for %s: %s", name, e)
+                return await load(args, kwargs)
+
+            if stored is not None:
+                cache_stats["hits"] += 1
+                return adapter.validate_json(stored)
+            cache_stats["misses"] += 1
+
+            lock_key = f"{key}:lock"
+            token = uuid.uuid4().hex
+            try:
+                acquired = await redis_client.set(lock_key, token, nx=True, ex=settings.CACHE_LOCK_TTL)
+            except Exception as e:
+                cache_stats["errors"] += 1
+                logging.warning("Cache lock failed for %s: %s", name, e)
+                return await load(args, kwargs)
+            if not acquired:
+                # Another worker is loading this key; wait for it instead of piling on the database
+                stored = await _wait_for(key)
+                if stored is not None:
+                    return adapter.validate_json(stored)
+                return await load(args, kwargs)
+
+            try:
+                result = await load(args, kwargs)
+                try:
+                    await redis_client.set(key, adapter.dump_json(result), ex=ttl or settings.CACHE_TTL)
+                except Exception as e:
+                    cache_stats["errors"] += 1
+                    logging.warning("Cache write failed for %s: %s", name, e)
+                return result
+            finally:
+                try:
+                    await release_lock(lock_key, token)
+                except Exception as e:
+                    logging.warning("Cache lock release failed for %s: %s", name, e)
+
+        return wrapper
+
+    return decorator
@@ -1,10 +1,94 @@
+import asyncio
+import hashlib
+import inspect
+import logging
+import time
+from contextlib import AsyncExitStack
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
+from .redis import redis_client
 from sqlalchemy.ext.declarative import declarative_base
 
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait and how many are waiting."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+
+    def _do_get(self):
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.waiting -= 1
+            self.checkouts += 1
+            self.checkout_seconds_total += elapsed
+            self.checkout_seconds_max = max(self.checkout_seconds_max, elapsed)
+
+    def recreate(self):
+        # Keep the counters when the pool is recreated after an invalidation
+        pool = super().recreate()
+        for name in ("checkouts", "timeouts", "checkout_seconds_total", "checkout_seconds_max"):
+            setattr(pool, name, getattr(self, name))
+        return pool
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "checkout_seconds_avg": self.checkout_seconds_total / self.checkouts if self.checkouts else 0.0,
+            "checkout_seconds_max": self.checkout_seconds_max,
+        }
+
+
+def _create_engine(url: str):
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # asyncpg's own statement cache and SQLAlchemy's prepared statement cache;
+            # both must be 0 behind a transaction-pooling PgBouncer
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
 # Create Async Engine
-engine = create_async_engine(settings.POSTGRES_URL, echo=False)
+engine = _create_engine(settings.POSTGRES_URL)
+# Read replica; without one, reads share the primary engine
+read_engine = _create_engine(settings.POSTGRES_READ_URL) if settings.POSTGRES_READ_URL else engine
 
 Base = declarative_base()
 
@@ -12,8 +96,142 @@ Base = declarative_base()
 AsyncSessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
+AsyncReadSessionLocal = sessionmaker(
+    bind=read_engine, class_=AsyncSession, expire_on_commit=False, info={"read_only": True}
+)
 
 # Dependency to get DB Session
 async def async_get_db():
+    """Unit of work: one transaction per request.
+
+    Services only flush; the transaction commits once when the route
+    returns and rolls back if it raises.
+    """
     async with AsyncSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        await run_on_commit(session)
+
+
+def on_commit(session: AsyncSession, callback: Callable[..., Any], *args) -> None:
+    """Run callback(*args) after the request's unit of work commits.
+
+    For side effects outside the database, such as cache invalidation, that
+    must not run before the commit or at all on rollback.
+    """
+    session.info.setdefault("on_commit", []).append((callback, args))
+
+
+async def run_on_commit(session: AsyncSession) -> None:
+    """Run the session's on_commit callbacks; async_get_db does this for request sessions."""
+    for callback, args in session.info.pop("on_commit", []):
+        try:
+            result = callback(*args)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logging.exception("on_commit callback %s failed", callback)
+
+
+# -------------------------------------------------------
+# read replica routing
+# -------------------------------------------------------
+
+# Set per request by read_your_writes_middleware; flipped when the request commits on the primary
+_request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+
+# Every request session commits, so only count commits that carried a write
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_write_statement(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_writes(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_primary_commit(session: Session) -> None:
+    wrote = session.info.pop("wrote", False)
+    writes = _request_writes.get()
+    if wrote and writes is not None and not session.info.get("read_only"):
+        writes["committed"] = True
+
+
+def _sticky_key(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return f"read_your_writes:{hashlib.sha256(authorization.encode()).hexdigest()}"
+
+
+async def _use_replica(request: Request) -> bool:
+    if read_engine is engine or request.method not in SAFE_METHODS:
+        return False
+    sticky_key = _sticky_key(request)
+    if sticky_key is None:
+        return True
+    try:
+        return not await redis_client.exists(sticky_key)
+    except Exception as e:
+        # Without the marker we can't rule out a recent write; stay on the primary
+        logging.warning("Read-your-writes lookup failed: %s", e)
+        return False
+
+
+async def async_get_read_db(request: Request):
+    """Session for read-only routes.
+
+    Safe requests go to the replica, except for READ_YOUR_WRITES_WINDOW
+    seconds after the caller's last commit on the primary, so they always
+    see their own writes despite replication lag.
+    """
+    session_factory = AsyncReadSessionLocal if await _use_replica(request) else AsyncSessionLocal
+    async with session_factory() as session:
         yield session
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    writes = {"committed": False}
+    _request_writes.set(writes)
+    response = await call_next(request)
+    sticky_key = _sticky_key(request)
+    if writes["committed"] and sticky_key and read_engine is not engine:
+        try:
+            await redis_client.set(sticky_key, "1", ex=settings.READ_YOUR_WRITES_WINDOW)
+        except Exception as e:
+            logging.warning("Read-your-writes marker failed: %s", e)
+    return response
+
+
+def pool_stats() -> dict:
+    return {
+        "primary": engine.pool.stats(),
+        "replica": read_engine.pool.stats() if read_engine is not engine else None,
+    }
+
+
+async def warm_up_pool() -> None:
+    """Open DB_POOL_WARMUP connections at startup so early requests don't pay the connect cost."""
+    count = min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+    for pool_engine in {engine, read_engine}:
+        try:
+            # Hold every connection at once, otherwise the pool would hand the same one back
+            async with AsyncExitStack() as stack:
+                connections = [await stack.enter_async_context(pool_engine.connect()) for _ in range(count)]
+                await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in connections))
+            logging.info("Database pool for %s warmed up with %s connections", pool_engine.url.host, count)
+        except Exception as e:
+            logging.warning("Database pool warm-up for %s failed: %s", pool_engine.url.host, e)
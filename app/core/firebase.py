@@ -1,5 +1,9 @@
+import asyncio
+import logging
+import random
+from typing import AsyncIterable, Awaitable, Callable, List, Set
 import firebase_admin
-from firebase_admin import credentials
+from firebase_admin import credentials, exceptions
 from firebase_admin import messaging
 import os
 from .config import settings
@@ -23,22 +27,35 @@ cred = credentials.Certificate(firebase_credentials)
 firebase_admin.initialize_app(cred)
 
 
-def build_fcm_message(token: str, title: str, message: str, link: str | None = None):
-    webpush_config = None
-    if link:
-        webpush_config = messaging.WebpushConfig(
-            fcm_options=messaging.WebpushFCMOptions(
-                link=link
-            )
+def build_webpush_config(link: str | None = None):
+    if not link:
+        return None
+    return messaging.WebpushConfig(
+        fcm_options=messaging.WebpushFCMOptions(
+            link=link
         )
+    )
+
 
+def build_fcm_message(token: str, title: str, message: str, link: str | None = None):
     return messaging.Message(
         token=token,
         notification=messaging.Notification(
             title=title,
             body=message,
         ),
-        webpush=webpush_config
+        webpush=build_webpush_config(link)
+    )
+
+
+def build_fcm_multicast_message(tokens: List[str], title: str, message: str, link: str | None = None):
+    return messaging.MulticastMessage(
+        tokens=tokens,
+        notification=messaging.Notification(
+            title=title,
+            body=message,
+        ),
+        webpush=build_webpush_config(link)
     )
 
 # send a notification to a specific device
@@ -51,4 +68,97 @@ def send_single_notification(token, title, body, link=None):
 def send_batch_notification(tokens, title, body, link=None):
     messages = [build_fcm_message(token, title, body, link) for token in tokens]
     response = messaging.send_each(messages)
-    return response
\ No newline at end of file
+    return response
+
+
+# -------------------------------------------------
+# async multicast dispatch
+# -------------------------------------------------
+
+TRANSIENT_FCM_ERRORS = (
+    exceptions.UnavailableError,
+    exceptions.InternalError,
+    exceptions.DeadlineExceededError,
+    messaging.QuotaExceededError,
+)
+# FCM's verdict that a token will never be deliverable again
+DEAD_TOKEN_ERRORS = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+
+
+async def _send_multicast_batch(tokens: List[str], title: str, body: str, link: str | None) -> List[str]:
+    """Send one multicast batch, retrying tokens that failed transiently. Returns dead tokens."""
+    dead_tokens = []
+    pending = tokens
+    for attempt in range(settings.FCM_MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(random.uniform(0, settings.FCM_RETRY_BACKOFF * 2 ** attempt))
+        message = build_fcm_multicast_message(pending, title, body, link)
+        try:
+            response = await asyncio.to_thread(messaging.send_each_for_multicast, message)
+        except TRANSIENT_FCM_ERRORS as e:
+            logging.warning("FCM batch of %d failed, retrying: %s", len(pending), e)
+            continue
+        except exceptions.FirebaseError as e:
+            logging.error("FCM batch of %d failed: %s", len(pending), e)
+            return dead_tokens
+
+        retry = []
+        for token, result in zip(pending, response.responses):
+            if result.success:
+                continue
+            if isinstance(result.exception, DEAD_TOKEN_ERRORS):
+                dead_tokens.append(token)
+            elif isinstance(result.exception, TRANSIENT_FCM_ERRORS):
+                retry.append(token)
+        pending = retry
+        if not pending:
+            return dead_tokens
+
+    logging.error("Giving up on %d FCM tokens after %d attempts", len(pending), settings.FCM_MAX_RETRIES + 1)
+    return dead_tokens
+
+
+async def dispatch_notification(
+    token_chunks: AsyncIterable[List[str]],
+    title: str,
+    body: str,
+    link: str | None = None,
+    on_dead_tokens: Callable[[List[str]], Awaitable[None]] | None = None,
+) -> None:
+    """Send a notification to every token as multicast batches, at most
+    FCM_MAX_CONCURRENCY in flight. Tokens FCM reports as unregistered are
+    handed to on_dead_tokens after each chunk, not held until the end.
+    """
+    in_flight: Set[asyncio.Task] = set()
+    dead_tokens: List[str] = []
+
+    async def collect(return_when: str) -> None:
+        nonlocal in_flight
+        done, in_flight = await asyncio.wait(in_flight, return_when=return_when)
+        for task in done:
+            dead_tokens.extend(task.result())
+
+    async def hand_over_dead_tokens() -> None:
+        finished = {task for task in in_flight if task.done()}
+        in_flight.difference_update(finished)
+        for task in finished:
+            dead_tokens.extend(task.result())
+        if dead_tokens and on_dead_tokens is not None:
+            await on_dead_tokens(list(dead_tokens))
+        dead_tokens.clear()
+
+    try:
+        async for tokens in token_chunks:
+            for start in range(0, len(tokens), settings.FCM_BATCH_SIZE):
+                # Waiting here also stops us reading tokens faster than we can send
+                if len(in_flight) >= settings.FCM_MAX_CONCURRENCY:
+                    await collect(asyncio.FIRST_COMPLETED)
+                batch = tokens[start:start + settings.FCM_BATCH_SIZE]
+                in_flight.add(asyncio.create_task(_send_multicast_batch(batch, title, body, link)))
+            await hand_over_dead_tokens()
+        if in_flight:
+            await collect(asyncio.ALL_COMPLETED)
+        await hand_over_dead_tokens()
+    finally:
+        for task in in_flight:
+            task.cancel()
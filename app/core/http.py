@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import httpx
+
+from .config import settings
+
+# One long-lived client per worker so outbound calls reuse keep-alive connections
+http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(
+        settings.HTTP_CLIENT_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT
+    ),
+    limits=httpx.Limits(
+        max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+    ),
+)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stop calling an upstream after repeated failures, then probe it again after a cool-down.
+
+    Once the cool-down has passed the breaker is half-open: exactly one call
+    goes through as a probe while the rest keep failing fast. The probe's
+    success closes the breaker; its failure opens it for another cool-down.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        if self.opened_at is None:
+            return False
+        return time.monotonic() - self.opened_at < self.reset_timeout
+
+    def before_call(self) -> None:
+        if self.opened_at is None:
+            return
+        if self.is_open:
+            raise CircuitOpenError("Circuit breaker is open")
+        now = time.monotonic()
+        # A probe that never reported back (cancelled, crashed) frees the slot after a cool-down
+        if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+            raise CircuitOpenError("Circuit breaker is half-open and probing")
+        self.probe_started_at = now
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.probe_started_at is not None:
+            self.opened_at = time.monotonic()
+            self.probe_started_at = None
+
+
+async def request_with_retry(
+    method: str,
+    url: str,
+    breaker: CircuitBreaker,
+    retries: int = settings.HTTP_CLIENT_RETRIES,
+    **kwargs,
+) -> httpx.Response:
+    """Send a request on the shared client, retrying transient failures with jittered backoff.
+
+    Non-idempotent methods are only retried when the connection was never made,
+    so a request that may have reached the upstream is not sent twice.
+    """
+    idempotent = method.upper() in ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            response = await http_client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            retryable = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+            if not retryable or attempt >= retries:
+                raise
+            logging.warning("%s %s failed (%s), retrying", method, url, e)
+        else:
+            if response.status_code < 500:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            if not (idempotent and response.status_code in RETRYABLE_STATUS_CODES) or attempt >= retries:
+                return response
+            logging.warning("%s %s returned %s, retrying", method, url, response.status_code)
+
+        # Full jitter: sleep anywhere up to the exponential backoff ceiling
+        await asyncio.sleep(random.uniform(0, settings.HTTP_CLIENT_BACKOFF * 2 ** attempt))
+        attempt += 1
+
+
+async def close_http_client() -> None:
+    await http_client.aclose()
@@ -0,0 +1,123 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+import uuid
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse
+from .config import settings
+from redis.exceptions import RedisError
+from .redis import redis_client, release_lock
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# Mutations clients are expected to retry; the side effects must run once per key
+IDEMPOTENT_ROUTES = {
+    ("POST", "/api/v1/transactions/"),
+    ("PUT", "/api/v1/wallets/deposit"),
+    ("PUT", "/api/v1/wallets/withdraw"),
+}
+
+
+def _error(status_code: int, message: str, error_code: str) -> JSONResponse:
+    return JSONResponse(
+        content={"message": message, "error_code": error_code},
+        status_code=status_code,
+    )
+
+
+def _replay(record: dict) -> Response:
+    response = Response(
+        content=base64.b64decode(record["body"]),
+        status_code=record["status_code"],
+        headers=record["headers"],
+    )
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+async def idempotency_middleware(request: Request, call_next):
+    """Run a keyed mutation once and replay its stored response to retries.
+
+    A duplicate that arrives while the first request is still running waits
+    for it instead of executing again. 5xx responses are not stored, so those
+    requests can be retried for real.
+
+    If Redis is unavailable before the handler runs, keyed requests get a 503
+    rather than running unguarded: these are money movements, and a retry
+    that ran twice could not be undone. Once the handler has run, Redis
+    failures only cost the stored replay and are logged.
+    """
+    idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not idempotency_key or (request.method, request.url.path) not in IDEMPOTENT_ROUTES:
+        return await call_next(request)
+    if len(idempotency_key) > 255:
+        return _error(status.HTTP_400_BAD_REQUEST, "Idempotency-Key is too long", "invalid_idempotency_key")
+
+    # Scope keys to the caller so nobody can replay another user's response
+    caller = hashlib.sha256(request.headers.get("authorization", "").encode()).hexdigest()
+    key = f"idempotency:{caller}:{request.method}:{request.url.path}:{idempotency_key}"
+    lock_key = f"{key}:lock"
+    body_hash = hashlib.sha256(await request.body()).hexdigest()
+
+    # Only the holder of this token may release the lock
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        try:
+            stored = await redis_client.get(key)
+            locked = not stored and await redis_client.set(lock_key, token, nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL)
+        except RedisError as e:
+            logging.warning("Idempotency store unavailable: %s", e)
+            response = _error(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Idempotency-Key requests are temporarily unavailable",
+                "idempotency_unavailable",
+            )
+            response.headers["Retry-After"] = "1"
+            return response
+        if stored:
+            record = json.loads(stored)
+            if record["body_hash"] != body_hash:
+                return _error(
+                    status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    "Idempotency-Key was already used with a different request body",
+                    "idempotency_key_reused",
+                )
+            return _replay(record)
+        if locked:
+            break
+        if time.monotonic() >= deadline:
+            return _error(
+                status.HTTP_409_CONFLICT,
+                "A request with this Idempotency-Key is still in progress",
+                "idempotency_request_in_progress",
+            )
+        await asyncio.sleep(0.1)
+
+    try:
+        response = await call_next(request)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        if response.status_code < 500:
+            record = {
+                "body_hash": body_hash,
+                "status_code": response.status_code,
+                "headers": dict(response.headers),
+                "body": base64.b64encode(body).decode(),
+            }
+            try:
+                await redis_client.set(key, json.dumps(record), ex=settings.IDEMPOTENCY_TTL)
+            except RedisError as e:
+                logging.warning("Storing idempotent response failed: %s", e)
+        return Response(
+            content=body,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+        )
+    finally:
+        try:
+            await release_lock(lock_key, token)
+        except RedisError as e:
+            logging.warning("Idempotency lock release failed: %s", e)
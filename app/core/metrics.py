@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from app.api.v1.auth.dependencies import RoleChecker
+from app.api.v1.auth.services.activity_sink import activity_sink
+from .cache import cache_stats
+from .database import pool_stats
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/", dependencies=[Depends(RoleChecker(["admin"]))])
+async def get_metrics():
+    """Connection pool saturation and cache effectiveness for this worker"""
+    return {
+        "database_pool": pool_stats(),
+        "cache": cache_stats,
+        "activity_sink": activity_sink.stats(),
+    }
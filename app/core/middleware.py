@@ -6,12 +6,17 @@ import time
 import logging
 from starlette.middleware.sessions import SessionMiddleware
 from app.core.config import settings
+from app.core.database import read_your_writes_middleware
+from app.core.idempotency import idempotency_middleware
 
 logger = logging.getLogger("uvicorn.access")
 logger.disabled = True
 
 
 def register_middleware(app: FastAPI):
+    app.middleware("http")(idempotency_middleware)
+    app.middleware("http")(read_your_writes_middleware)
+
     @app.middleware("http")
     async def custom_logging(request: Request, call_next):
         start_time = time.time()
@@ -0,0 +1,60 @@
+import base64
+from datetime import datetime
+from typing import Any, Optional, Sequence
+from uuid import UUID
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, desc, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# Keyset pagination over (created_at, id), newest first. A cursor is the
+# opaque position of the last row of the previous page, so every page is an
+# index seek instead of an O(offset) scan.
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Invalid pagination cursor",
+                "error_code": "invalid_cursor"
+            }
+        )
+
+
+def paginate(statement: Select, model: Any, limit: Optional[int], cursor: Optional[str] = None, offset: int = 0) -> Select:
+    """Order a select newest first and restrict it to the page after `cursor`.
+
+    `offset` is still honoured when no cursor is given, for older clients.
+    A limit of None reads to the end, for streaming.
+    """
+    statement = statement.order_by(desc(model.created_at), desc(model.id))
+    if limit is not None:
+        statement = statement.limit(limit)
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        return statement.where(tuple_(model.created_at, model.id) < tuple_(created_at, id))
+    if offset:
+        return statement.offset(offset)
+    return statement
+
+
+def next_cursor(items: Sequence[Any], limit: int) -> Optional[str]:
+    """Cursor for the page after `items`, or None when this was the last page."""
+    if not items or len(items) < limit:
+        return None
+    return encode_cursor(items[-1].created_at, items[-1].id)
+
+
+def set_next_cursor(response: Response, items: Sequence[Any], limit: int) -> None:
+    cursor = next_cursor(items, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
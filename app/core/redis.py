@@ -1,23 +1,95 @@
+import asyncio
+import logging
+import time
 from typing import Optional
 import redis.asyncio as aioredis
 
+from .bloom import BloomFilter
 from .config import settings
 
 JTI_EXPIRY = 3600  # 1 hour
+JTI_BLOCKLIST_CHANNEL = "jti_blocklist"
+JTI_KEY_PATTERN = "????????-????-????-????-????????????"  # str(uuid4())
 
-token_blocklist = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+token_blocklist = redis_client
+
+# Deletes a lock only while it still holds the caller's token, so a holder
+# that outlived the TTL can't release a lock someone else has since taken
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+async def release_lock(key: str, token: str) -> bool:
+    """Delete a lock taken with SET NX if it still carries `token`."""
+    return bool(await redis_client.eval(_RELEASE_LOCK, 1, key, token))
+
+
+# Local front for the blocklist; None until hydrated, in which case every
+# lookup goes to Redis.
+revoked_jti_filter: Optional[BloomFilter] = None
 
 
 async def add_jti_to_blocklist(jti: str) -> None:
     await token_blocklist.set(name=jti, value="", ex=JTI_EXPIRY)
+    if revoked_jti_filter is not None:
+        revoked_jti_filter.add(jti)
+    await token_blocklist.publish(JTI_BLOCKLIST_CHANNEL, jti)
 
 
 async def token_in_blocklist(jti: str) -> bool:
+    # A Bloom filter miss is definitive; only possible positives hit Redis
+    if revoked_jti_filter is not None and jti not in revoked_jti_filter:
+        return False
+
     jti = await token_blocklist.get(jti)
 
     return jti is not None
 
 
+async def _build_revoked_jti_filter() -> BloomFilter:
+    bloom = BloomFilter(settings.JTI_BLOOM_CAPACITY, settings.JTI_BLOOM_ERROR_RATE)
+    async for key in token_blocklist.scan_iter(match=JTI_KEY_PATTERN, count=1000):
+        bloom.add(key)
+    return bloom
+
+
+async def sync_jti_blocklist() -> None:
+    """Keep revoked_jti_filter in step with Redis for the lifetime of the app.
+
+    Revocations from other workers arrive over pub/sub. The filter is rebuilt
+    from a key scan on every (re)connect and once per JTI_EXPIRY, so expired
+    JTIs age out of it.
+    """
+    global revoked_jti_filter
+    while True:
+        pubsub = token_blocklist.pubsub()
+        try:
+            # Subscribe before scanning so no revocation slips in between
+            await pubsub.subscribe(JTI_BLOCKLIST_CHANNEL)
+            revoked_jti_filter = await _build_revoked_jti_filter()
+            rebuild_at = time.monotonic() + JTI_EXPIRY
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message:
+                    revoked_jti_filter.add(message["data"])
+                if time.monotonic() >= rebuild_at:
+                    revoked_jti_filter = await _build_revoked_jti_filter()
+                    rebuild_at = time.monotonic() + JTI_EXPIRY
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            revoked_jti_filter = None
+            logging.warning("JTI blocklist sync lost, falling back to Redis: %s", e)
+            await asyncio.sleep(5)
+        finally:
+            await pubsub.aclose()
+
+
 async def add_oauth_code_to_blocklist(code: str, user_id: str) -> None:
     await token_blocklist.set(name=code, value=user_id, ex=JTI_EXPIRY)
 
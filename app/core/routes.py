@@ -10,6 +10,7 @@ from app.api.v1.auth.routes.routes import auth_router
 from app.api.v1.auth.routes.user_routes import user_router
 from app.api.v1.auth.routes.two_factor_routes import twoFA_router
 from app.core.templates import email_preview_router
+from app.core.metrics import metrics_router
 from app.api.v1.files.routes import file_router
 
 router = APIRouter()
@@ -39,3 +40,5 @@ router.include_router(
     notification_router, prefix="/notifications", tags=["notifications"])
 
 router.include_router(file_router, prefix="/files", tags=["files"])
+
+router.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
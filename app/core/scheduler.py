@@ -0,0 +1,22 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from .redis import redis_client
+
+
+async def run_periodic(name: str, interval: int, job: Callable[[], Awaitable[None]]) -> None:
+    """Run job every interval seconds on exactly one worker of the cluster.
+
+    Every worker runs this loop; a Redis NX lock that lives for one interval
+    elects which of them does the work each time round.
+    """
+    while True:
+        try:
+            if await redis_client.set(f"scheduler:{name}", "1", nx=True, ex=interval):
+                await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.exception("Scheduled job %s failed", name)
+        await asyncio.sleep(interval)
@@ -1,12 +1,24 @@
-
-from typing import Dict, List
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Set
 from uuid import UUID
 from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from .config import settings
+from .redis import redis_client
+
+CHANNEL_PREFIX = "ws:"
 
-# In-memory connection manager (simple version)
+
+# Cluster-aware connection manager: sockets live in the worker that accepted
+# them, messages travel between workers over one Redis channel per context.
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, redis=redis_client):
+        self.redis = redis
         self.active_connections: Dict[UUID, Dict[str, List[WebSocket]]] = {}
+        # Strong references to background deliveries and closes until they finish
+        self._tasks: Set[asyncio.Task] = set()
 
     async def connect(self, user_id: UUID, websocket: WebSocket, context: str):
         """Connect user to a specified context (e.g., 'dashboard', 'notifications')."""
@@ -22,14 +34,92 @@ class ConnectionManager:
     def disconnect(self, user_id: UUID, websocket: WebSocket, context: str):
         """Disconnect a user from a specific context."""
         if user_id in self.active_connections and context in self.active_connections[user_id]:
-            self.active_connections[user_id][context].remove(websocket)
+            if websocket in self.active_connections[user_id][context]:
+                self.active_connections[user_id][context].remove(websocket)
             if not self.active_connections[user_id][context]:
                 del self.active_connections[user_id][context]
                 if not self.active_connections[user_id]:
                     del self.active_connections[user_id]
 
     async def send_notification(self, user_id: UUID, context: str, data: dict):
-        """Send message to a specific context (e.g., 'notifications') of a user."""
-        if user_id in self.active_connections and context in self.active_connections[user_id]:
-            for connection in self.active_connections[user_id][context]:
-                await connection.send_json(data)
+        """Send message to a specific context (e.g., 'notifications') of a user, on whichever worker holds it."""
+        await self._publish(context, {"user_id": str(user_id), "data": data})
+
+    async def send_notification_to_users(self, user_ids: Iterable[UUID], context: str, data: dict):
+        """Send the same message to several users, in one round trip to Redis."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.publish(CHANNEL_PREFIX + context, self._encode({"user_id": str(user_id), "data": data}))
+            await pipe.execute()
+
+    async def broadcast(self, context: str, data: dict):
+        """Send message to every user connected to a context, across all workers."""
+        await self._publish(context, {"user_id": None, "data": data})
+
+    async def _publish(self, context: str, payload: dict):
+        await self.redis.publish(CHANNEL_PREFIX + context, self._encode(payload))
+
+    @staticmethod
+    def _encode(payload: dict) -> str:
+        return json.dumps(jsonable_encoder(payload))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_to_sockets(self, user_id: UUID, context: str, data: dict):
+        connections = list(self.active_connections.get(user_id, {}).get(context, []))
+        # A stalled socket must not hold up fan-out to everyone else on this worker
+        results = await asyncio.gather(
+            *(asyncio.wait_for(connection.send_json(data), settings.WEBSOCKET_SEND_TIMEOUT) for connection in connections),
+            return_exceptions=True,
+        )
+        # Forget sockets that died or stalled without a clean disconnect
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.disconnect(user_id, connection, context)
+                self._spawn(self._close(connection))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(), settings.WEBSOCKET_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    async def _deliver_local(self, user_id: Optional[UUID], context: str, data: dict):
+        if user_id is not None:
+            await self._send_to_sockets(user_id, context, data)
+            return
+        await asyncio.gather(*(
+            self._send_to_sockets(connected_user_id, context, data)
+            for connected_user_id, contexts in list(self.active_connections.items())
+            if context in contexts
+        ))
+
+    def _dispatch(self, message: dict):
+        """Deliver one pub/sub message in the background, so a stalled socket can't hold up the next."""
+        context = message["channel"][len(CHANNEL_PREFIX):]
+        payload = json.loads(message["data"])
+        user_id = UUID(payload["user_id"]) if payload["user_id"] else None
+        self._spawn(self._deliver_local(user_id, context, payload["data"]))
+
+    async def listen(self):
+        """Deliver messages published by any worker to the sockets held here. Runs for the app's lifetime."""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning("WebSocket fan-out subscription lost, reconnecting: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+manager = ConnectionManager()
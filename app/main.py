@@ -1,10 +1,21 @@
+import asyncio
 from fastapi import FastAPI
 from app.core.config import settings
+from app.core.database import warm_up_pool
 from app.core.routes import router as main_router
 from app.core.middleware import register_middleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from app.api.v1.auth.errors import register_general_error_handlers
+from app.api.v1.auth.services.activity_sink import activity_sink
+from app.api.v1.auth.services.service import maintain_activity_partitions
+from app.api.v1.auth.utils import shutdown_passwd_hash_pool
+from app.api.v1.transactions.service import snapshot_wallet_balances
+from app.api.v1.transactions.webhooks import consume_paystack_events
+from app.core.http import close_http_client
+from app.core.redis import sync_jti_blocklist
+from app.core.scheduler import run_periodic
+from app.core.websocket import manager as websocket_manager
 
 description = """
 Mimipoint API is a powerful and flexible API designed to help you manage your data efficiently. 
@@ -17,7 +28,35 @@ It provides a wide range of features and functionalities to meet your needs.
 async def lifespan(app: FastAPI):
     # Register all errors
     register_general_error_handlers(app)
+    # Pre-open database connections before taking traffic
+    await warm_up_pool()
+    # Write activity rows in batches in the background
+    activity_sink.start()
+    # Keep the local revoked-token filter in step with Redis
+    jti_sync_task = asyncio.create_task(sync_jti_blocklist())
+    # Fan WebSocket messages published by any worker out to local sockets
+    websocket_task = asyncio.create_task(websocket_manager.listen())
+    # Settle queued Paystack webhook events
+    paystack_events_task = asyncio.create_task(consume_paystack_events())
+    # Periodic jobs, each run by one worker at a time
+    scheduled_tasks = [
+        asyncio.create_task(run_periodic(
+            "wallet_balance_snapshot", settings.WALLET_SNAPSHOT_INTERVAL, snapshot_wallet_balances
+        )),
+        asyncio.create_task(run_periodic(
+            "activity_partitions", settings.ACTIVITY_PARTITION_INTERVAL, maintain_activity_partitions
+        )),
+    ]
     yield
+    jti_sync_task.cancel()
+    websocket_task.cancel()
+    paystack_events_task.cancel()
+    for task in scheduled_tasks:
+        task.cancel()
+    # Flush queued activity rows before the pool goes away
+    await activity_sink.stop()
+    shutdown_passwd_hash_pool()
+    await close_http_client()
     
 
 app = FastAPI(title=settings.PROJECT_NAME,
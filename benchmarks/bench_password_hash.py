@@ -0,0 +1,93 @@
+"""Benchmark an unrelated endpoint's latency while logins hash passwords.
+
+Before: routes called passlib bcrypt inline, blocking the event loop for
+each hash. After: verify_password_async runs it on the bounded
+passwd_hash_pool. A trivial GET endpoint is polled through the ASGI app
+while the logins run, and its p50/p99 latency is reported for each.
+
+    PYTHONPATH=. python benchmarks/bench_password_hash.py [logins]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.v1.auth.utils import (
+    generate_passwd_hash,
+    shutdown_passwd_hash_pool,
+    verify_password,
+    verify_password_async,
+)
+
+PASSWORD = "correct horse"
+# One /ping request is due every interval, like steady background traffic
+PROBE_INTERVAL = 0.01
+
+
+def make_app(hash: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login/inline")
+    async def login_inline() -> bool:
+        return verify_password(PASSWORD, hash)
+
+    @app.post("/login/pooled")
+    async def login_pooled() -> bool:
+        return await verify_password_async(PASSWORD, hash)
+
+    @app.get("/ping")
+    async def ping() -> str:
+        return "pong"
+
+    return app
+
+
+async def probe(client: httpx.AsyncClient, until: asyncio.Future, latencies: list) -> None:
+    """Request /ping once per PROBE_INTERVAL for as long as the logins run.
+
+    Latency counts from when each request was due, not from when a blocked
+    loop got round to sending it, so time spent queued behind a stall shows.
+    """
+    due = time.perf_counter()
+    while not until.done() or due < until.result():
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        await client.get("/ping")
+        latencies.append(time.perf_counter() - due)
+        due += PROBE_INTERVAL
+
+
+async def run(client: httpx.AsyncClient, login_path: str, logins: int) -> tuple[float, list]:
+    """Run `logins` concurrent logins while probing /ping."""
+    until, latencies = asyncio.get_running_loop().create_future(), []
+    prober = asyncio.create_task(probe(client, until, latencies))
+    started = time.perf_counter()
+    await asyncio.gather(*(client.post(login_path) for _ in range(logins)))
+    finished = time.perf_counter()
+    until.set_result(finished)
+    await prober
+    return finished - started, latencies
+
+
+def percentile(values: list, pct: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1] if len(values) > 1 else values[0]
+
+
+async def main(logins: int) -> None:
+    app = make_app(generate_passwd_hash(PASSWORD))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/ping")
+        for name, path in (("before (inline bcrypt)", "/login/inline"), ("after (hash pool)", "/login/pooled")):
+            elapsed, latencies = await run(client, path, logins)
+            print(
+                f"{name:<24} {logins} logins in {elapsed:.3f}s  /ping p50 {percentile(latencies, 50) * 1000:7.1f} ms"
+                f"  p99 {percentile(latencies, 99) * 1000:7.1f} ms  max {max(latencies) * 1000:7.1f} ms"
+                f"  ({len(latencies)} requests)"
+            )
+    shutdown_passwd_hash_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 8))
@@ -0,0 +1,171 @@
+"""Benchmark product search over a large seeded catalog.
+
+Before: search_products ran ILIKE '%q%' on name and description, newest
+first. After: the ranked full-text + trigram search behind the GIN indexes.
+Seeds the products with generate_series, then times both for a few kinds
+of query and prints the EXPLAIN (ANALYZE, BUFFERS) of each.
+
+    PYTHONPATH=. python benchmarks/bench_product_search.py DATABASE_URL [products]
+
+DATABASE_URL (postgresql+asyncpg://...) must be a disposable database with
+pg_trgm available: its tables are dropped and recreated.
+"""
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+from sqlalchemy import desc, event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api.v1.auth.models import *  # noqa: F401,F403 - register every model, as alembic/env.py does
+from app.api.v1.complaints.models import *  # noqa: F401,F403
+from app.api.v1.easybuy.models import *  # noqa: F401,F403
+from app.api.v1.transactions.models import *  # noqa: F401,F403
+from app.api.v1.notifications.models import *  # noqa: F401,F403
+from app.api.v1.auth.models import User
+from app.api.v1.easybuy.models import Product
+from app.api.v1.easybuy.service import ProductService
+from app.core.database import Base
+
+REPEAT = 5
+QUERIES = {
+    "common word": "kettle",
+    "two words": "wireless speaker",
+    "prefix (typing)": "stainl",
+    "typo": "bluetoth",
+    "rare": "model 731337",
+    "no match": "zeppelin",
+}
+SEARCH_INDEXES = ("ix_products_search_vector", "ix_products_name_trgm")
+
+SEED = """
+INSERT INTO products (id, owner_id, name, description, price, quantity, image, tags, redirect_link,
+                      created_at, updated_at)
+SELECT gen_random_uuid(), :owner_id,
+       (array['Wireless', 'Stainless', 'Bluetooth', 'Portable', 'Smart', 'Electric', 'Organic', 'Compact'])[1 + g % 8]
+       || ' ' ||
+       (array['Kettle', 'Speaker', 'Blender', 'Lamp', 'Backpack', 'Charger', 'Headphones', 'Toaster', 'Mixer',
+              'Camera', 'Router', 'Keyboard', 'Monitor'])[1 + (g / 8) % 13]
+       || ' model ' || g,
+       'A ' || (array['reliable', 'lightweight', 'durable', 'affordable', 'premium'])[1 + g % 5]
+       || ' pick for ' || (array['home', 'office', 'travel', 'outdoor', 'gaming', 'kitchen'])[1 + (g / 5) % 6]
+       || ' use, batch ' || (g % 1000),
+       (g % 50000) / 100.0 + 1, g % 100, 'https://example.com/p.png', '[]'::jsonb, 'https://example.com/p',
+       now() - make_interval(secs => g), now()
+FROM generate_series(1, :products) AS g
+"""
+
+
+def old_search(query: str, limit: int = 50, offset: int = 0):
+    # search_products before the full-text change
+    return select(Product).where(
+        (Product.name.ilike(f"%{query}%")) | (
+            Product.description.ilike(f"%{query}%"))
+    ).order_by(desc(Product.created_at)).limit(limit).offset(offset)
+
+
+async def seed(engine, products: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(Base.metadata.create_all)
+        # Building the GIN indexes once after the load is far quicker than maintaining them row by row
+        for name in SEARCH_INDEXES:
+            await conn.execute(text(f"DROP INDEX {name}"))
+    async with AsyncSession(engine) as session:
+        owner = User(first_name="Bench", email=f"{uuid.uuid4()}@example.com")
+        session.add(owner)
+        await session.flush()
+        started = time.perf_counter()
+        await session.execute(text(SEED), {"owner_id": owner.id, "products": products})
+        await session.commit()
+        print(f"seeded {products} products in {time.perf_counter() - started:.1f}s")
+    async with engine.begin() as conn:
+        started = time.perf_counter()
+        for index in Product.__table__.indexes:
+            if index.name in SEARCH_INDEXES:
+                await conn.run_sync(index.create)
+        print(f"built search indexes in {time.perf_counter() - started:.1f}s")
+    async with engine.connect() as conn:
+        await (await conn.execution_options(isolation_level="AUTOCOMMIT")).execute(text("VACUUM ANALYZE products"))
+
+
+class StatementCapture:
+    """Remembers the first SQL statement run while active, to EXPLAIN it afterwards."""
+
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.statement = None
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._capture)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._capture)
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if self.statement is None:
+            self.statement = (statement, parameters)
+
+
+async def rows(session, statement) -> list:
+    return list((await session.execute(statement)).scalars())
+
+
+async def timed(session_factory, run) -> tuple[float, int]:
+    """Median milliseconds of `run` over REPEAT warm runs, and its row count."""
+    timings = []
+    for _ in range(REPEAT + 1):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            found = await run(session)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings[1:]), len(found)
+
+
+async def explain(engine, run) -> str:
+    with StatementCapture(engine) as capture:
+        async with AsyncSession(engine) as session:
+            await run(session)
+    statement, parameters = capture.statement
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+        return "\n".join(f"    {row[0]}" for row in result)
+
+
+async def main(url: str, products: int) -> None:
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    service = ProductService()
+    await seed(engine, products)
+
+    plans = []
+    print(f"\n{'query':<18} {'before (ILIKE)':>22} {'after (FTS + trigram)':>26}")
+    for label, query in QUERIES.items():
+        def before(session, query=query):
+            return rows(session, old_search(query))
+
+        def after(session, query=query):
+            return service.search_products(query, session)
+
+        before_ms, before_rows = await timed(session_factory, before)
+        after_ms, after_rows = await timed(session_factory, after)
+        print(f"{label:<18} {before_ms:10.1f} ms {before_rows:3} rows {after_ms:13.1f} ms {after_rows:3} rows")
+        plans.append((label, query, before, after))
+
+    for label, query, before, after in plans:
+        print(f"\n=== {label}: {query!r}")
+        print("  before:")
+        print(await explain(engine, before))
+        print("  after:")
+        print(await explain(engine, after))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    asyncio.run(main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000))
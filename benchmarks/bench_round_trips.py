@@ -0,0 +1,113 @@
+"""Count the database round trips one request makes.
+
+Before: services committed and refreshed after each write, and activity rows
+were flushed on their own. After: async_get_db commits the request's work
+once. POST /transactions/ (an airtime purchase paid from a wallet: insert the
+transaction, debit the wallet, record the activity) is driven through the
+ASGI app, and every statement, BEGIN, COMMIT and ROLLBACK the engine sends is
+counted per request.
+
+    POSTGRES_URL=postgresql+asyncpg://... PYTHONPATH=. python benchmarks/bench_round_trips.py [requests]
+
+POSTGRES_URL must be a disposable database: its tables are dropped and
+recreated. The activity sink isn't started, so activity rows are written by
+the request itself, as before.
+"""
+import asyncio
+import sys
+import uuid
+from collections import Counter
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import event, text
+
+from app.api.v1.auth.models import *  # noqa: F401,F403 - register every model, as alembic/env.py does
+from app.api.v1.complaints.models import *  # noqa: F401,F403
+from app.api.v1.easybuy.models import *  # noqa: F401,F403
+from app.api.v1.transactions.models import *  # noqa: F401,F403
+from app.api.v1.notifications.models import *  # noqa: F401,F403
+from app.api.v1.auth.dependencies import get_current_user
+from app.api.v1.auth.models import Activity, User
+from app.api.v1.transactions.models import Wallet
+from app.api.v1.transactions.routes import transaction_router
+from app.core.database import AsyncSessionLocal, Base, engine
+
+WARMUP = 5
+
+
+class RoundTripCounter:
+    """Counts what the engine sends to the database while active."""
+
+    EVENTS = ("before_cursor_execute", "begin", "commit", "rollback")
+
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.counts = Counter()
+
+    def __enter__(self):
+        for name in self.EVENTS:
+            event.listen(self.engine, name, getattr(self, f"_on_{name}"))
+        return self
+
+    def __exit__(self, *exc):
+        for name in self.EVENTS:
+            event.remove(self.engine, name, getattr(self, f"_on_{name}"))
+
+    def _on_before_cursor_execute(self, *args):
+        self.counts["statements"] += 1
+
+    def _on_begin(self, conn):
+        self.counts["begin"] += 1
+
+    def _on_commit(self, conn):
+        self.counts["commit"] += 1
+
+    def _on_rollback(self, conn):
+        self.counts["rollback"] += 1
+
+
+async def setup() -> tuple[User, Wallet]:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(Base.metadata.create_all)
+        if Activity.__table__.dialect_options["postgresql"].get("partition_by"):
+            await conn.execute(text("CREATE TABLE activities_default PARTITION OF activities DEFAULT"))
+    async with AsyncSessionLocal() as session:
+        user = User(first_name="Bench", email=f"{uuid.uuid4()}@example.com")
+        session.add(user)
+        await session.flush()
+        wallet = Wallet(user_id=user.id, balance=1_000_000)
+        session.add(wallet)
+        await session.commit()
+        return user, wallet
+
+
+async def main(requests: int) -> None:
+    user, wallet = await setup()
+    app = FastAPI()
+    app.include_router(transaction_router, prefix="/transactions")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=user.id)
+    body = {"user_id": str(user.id), "wallet_id": str(wallet.id), "transaction_type": "airtime", "amount": 1}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        # Lets asyncpg prepare and cache each statement first
+        for _ in range(WARMUP):
+            (await client.post("/transactions/", json=body)).raise_for_status()
+        with RoundTripCounter(engine) as counter:
+            for _ in range(requests):
+                (await client.post("/transactions/", json=body)).raise_for_status()
+
+    per_request = {name: counter.counts[name] / requests for name in ("statements", "begin", "commit", "rollback")}
+    print(
+        f"POST /transactions/ x{requests}: "
+        + "  ".join(f"{name} {count:.1f}" for name, count in per_request.items())
+        + f"  round trips/request {sum(per_request.values()):.1f}"
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
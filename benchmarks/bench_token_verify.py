@@ -0,0 +1,37 @@
+"""Micro-benchmark for per-request JWT verification.
+
+Before: TokenBearer decoded each token twice (decode_token, then again in
+token_valid). After: one verify_token call, served from the memo for a
+token seen recently.
+
+    PYTHONPATH=. python benchmarks/bench_token_verify.py [requests]
+
+Uses the JWT settings from the environment or .env (e.g. JWT_ALGORITHM=HS256).
+"""
+import sys
+import timeit
+
+from app.api.v1.auth.utils import create_access_token, decode_token, verified_token_memo, verify_token
+
+
+def before(token: str) -> None:
+    decode_token(token)
+    decode_token(token)
+
+
+def after(token: str) -> None:
+    verify_token(token)
+
+
+def main(requests: int) -> None:
+    token = create_access_token({"id": "00000000-0000-0000-0000-000000000001", "email": "bench@example.com"})
+    verified_token_memo.clear()
+    after(token)  # first request of a session pays for the decode
+
+    for name, func in (("before (decode twice)", before), ("after (memoized verify)", after)):
+        seconds = min(timeit.repeat(lambda: func(token), number=requests, repeat=5))
+        print(f"{name:<26} {seconds:.4f}s per {requests} requests  {seconds / requests * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,73 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.api.v1.auth.models import *  # noqa: F401,F403 - register every model, as alembic/env.py does
+from app.api.v1.complaints.models import *  # noqa: F401,F403
+from app.api.v1.easybuy.models import *  # noqa: F401,F403
+from app.api.v1.transactions.models import *  # noqa: F401,F403
+from app.api.v1.notifications.models import *  # noqa: F401,F403
+from app.core import http
+from app.core.config import settings
+from app.core.database import Base
+
+# A disposable Postgres database (postgresql+asyncpg://...) with the pg_trgm
+# extension available. Its tables are dropped and recreated on every run.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def mock_upstream(monkeypatch):
+    """Point the shared HTTP client at an in-process stub server.
+
+    Call the returned function with a handler taking an httpx.Request and
+    returning an httpx.Response (or raising an httpx error). Retries run
+    without backoff sleeps.
+    """
+    def install(handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(http, "http_client", client)
+        return client
+
+    monkeypatch.setattr(settings, "HTTP_CLIENT_BACKOFF", 0)
+    yield install
+
+
+async def _create_schema(url: str) -> None:
+    engine = create_async_engine(url, poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(Base.metadata.create_all)
+        # activities is partitioned; the maintenance job's monthly partitions aren't needed here
+        await conn.execute(text("CREATE TABLE activities_default PARTITION OF activities DEFAULT"))
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def database_url():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    asyncio.run(_create_schema(TEST_DATABASE_URL))
+    return TEST_DATABASE_URL
+
+
+@pytest_asyncio.fixture
+async def session_factory(database_url):
+    """Session factory on the test database; every table is emptied afterwards.
+
+    NullPool gives each concurrent session its own connection, and so its
+    own transaction, like separate requests in production.
+    """
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+        await conn.execute(text(f"TRUNCATE {tables} CASCADE"))
+    await engine.dispose()
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from app.api.v1.auth.services.activity_sink import ActivitySink
+from app.core.config import settings
+
+
+def make_sink(monkeypatch, maxsize=100, batch_size=3, flush_interval=60.0, release=None):
+    """Sink whose writes are recorded instead of inserted; they block on `release` if given."""
+    sink = ActivitySink(maxsize=maxsize, batch_size=batch_size, flush_interval=flush_interval)
+    batches = []
+
+    async def write(rows):
+        if release is not None:
+            await release.wait()
+        batches.append([row["n"] for row in rows])
+
+    monkeypatch.setattr(sink, "_write", write)
+    return sink, batches
+
+
+@pytest.mark.asyncio
+async def test_rows_are_written_in_batches_of_batch_size(monkeypatch):
+    sink, batches = make_sink(monkeypatch, batch_size=3)
+    sink.start()
+
+    for n in range(7):
+        await sink.add({"n": n})
+    await asyncio.sleep(0.01)
+
+    # Two full batches go out at once; the last row waits for the flush interval
+    assert batches == [[0, 1, 2], [3, 4, 5]]
+    await sink.stop()
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_flushed_after_the_interval(monkeypatch):
+    sink, batches = make_sink(monkeypatch, batch_size=100, flush_interval=0.05)
+    sink.start()
+
+    await sink.add({"n": 0})
+    await sink.add({"n": 1})
+    await asyncio.sleep(0.1)
+
+    assert batches == [[0, 1]]
+    await sink.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_everything_queued(monkeypatch):
+    sink, batches = make_sink(monkeypatch, batch_size=4, flush_interval=60)
+    sink.start()
+
+    for n in range(10):
+        await sink.add({"n": n})
+    await asyncio.wait_for(sink.stop(), timeout=1)
+
+    assert [n for batch in batches for n in batch] == list(range(10))
+    assert not sink.running
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_rows_instead_of_spawning_writes(monkeypatch):
+    monkeypatch.setattr(settings, "ACTIVITY_ENQUEUE_TIMEOUT", 0.01)
+    release = asyncio.Event()
+    sink, batches = make_sink(monkeypatch, maxsize=2, batch_size=1, release=release)
+    sink.start()
+
+    # The writer takes row 0 and stalls on it; rows 1 and 2 fill the queue
+    for n in range(3):
+        await sink.add({"n": n})
+    await asyncio.sleep(0.01)
+    for n in range(3, 53):
+        await sink.add({"n": n})
+
+    assert sink.dropped == 50
+    # Nothing was written around the queue while it was full
+    assert batches == [] and len(asyncio.all_tasks()) == 2  # this test and the writer
+
+    release.set()
+    await sink.stop()
+    assert batches == [[0], [1], [2]]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_waits_briefly_for_room(monkeypatch):
+    monkeypatch.setattr(settings, "ACTIVITY_ENQUEUE_TIMEOUT", 1)
+    release = asyncio.Event()
+    sink, batches = make_sink(monkeypatch, maxsize=1, batch_size=1, release=release)
+    sink.start()
+    await sink.add({"n": 0})
+    await asyncio.sleep(0.01)
+    await sink.add({"n": 1})
+
+    # Room frees up while row 2 waits, so nothing is dropped
+    asyncio.get_running_loop().call_later(0.05, release.set)
+    await sink.add({"n": 2})
+
+    await sink.stop()
+    assert sink.dropped == 0
+    assert batches == [[0], [1], [2]]
+
+
+@pytest.mark.asyncio
+async def test_rows_after_stop_are_written_directly(monkeypatch):
+    sink, batches = make_sink(monkeypatch)
+
+    await sink.add({"n": 0})
+
+    assert batches == [[0]]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+
+
+@pytest.fixture
+def firebase(monkeypatch):
+    """app.core.firebase with FCM replaced by a fake that marks tokens starting "dead" as unregistered."""
+    try:
+        from app.core import firebase
+    except ValueError:
+        pytest.skip("Firebase credentials are not configured")
+    state = {"in_flight": 0, "max_in_flight": 0, "batches": []}
+
+    async def send(tokens, title, body, link):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        state["batches"].append(tokens)
+        return [token for token in tokens if token.startswith("dead")]
+
+    monkeypatch.setattr(firebase, "_send_multicast_batch", send)
+    monkeypatch.setattr(settings, "FCM_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "FCM_MAX_CONCURRENCY", 3)
+    firebase.fake_fcm = state
+    return firebase
+
+
+async def chunks(*token_chunks):
+    for tokens in token_chunks:
+        yield tokens
+
+
+@pytest.mark.asyncio
+async def test_every_token_is_sent_with_bounded_concurrency(firebase):
+    tokens = [f"t{n}" for n in range(40)]
+
+    await firebase.dispatch_notification(chunks(tokens[:20], tokens[20:]), "Title", "Body")
+
+    assert sorted(token for batch in firebase.fake_fcm["batches"] for token in batch) == sorted(tokens)
+    assert firebase.fake_fcm["max_in_flight"] == 3
+    # Nothing is left running or referenced once the broadcast returns
+    assert len(asyncio.all_tasks()) == 1
+
+
+@pytest.mark.asyncio
+async def test_dead_tokens_are_handed_over_while_the_broadcast_runs(firebase):
+    handed_over = []
+
+    async def on_dead_tokens(tokens):
+        handed_over.append(tokens)
+
+    async def token_chunks():
+        yield ["dead0", "t0"]
+        for n in range(1, 4):
+            yield [f"t{2 * n}", f"t{2 * n + 1}"]
+        # Sending the fourth batch waited for the first, whose dead token went out with that chunk
+        assert handed_over == [["dead0"]]
+        yield ["t8", "dead1"]
+        yield ["dead2"]
+
+    await firebase.dispatch_notification(token_chunks(), "Title", "Body", on_dead_tokens=on_dead_tokens)
+
+    assert sorted(token for tokens in handed_over for token in tokens) == ["dead0", "dead1", "dead2"]
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_cancels_batches_in_flight(firebase):
+    async def token_chunks():
+        yield ["t0", "t1", "t2", "t3"]
+        raise RuntimeError("stream lost")
+
+    with pytest.raises(RuntimeError):
+        await firebase.dispatch_notification(token_chunks(), "Title", "Body")
+    await asyncio.sleep(0)
+
+    assert len(asyncio.all_tasks()) == 1
+    assert firebase.fake_fcm["batches"] == []
@@ -0,0 +1,175 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.http import CircuitBreaker, CircuitOpenError, request_with_retry
+
+URL = "https://upstream.test/resource"
+
+
+def counting(responses):
+    """Handler that replays `responses` in order and counts the calls."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        result = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return handler, calls
+
+
+@pytest.mark.asyncio
+async def test_get_is_retried_on_retryable_status(mock_upstream):
+    handler, calls = counting([httpx.Response(503), httpx.Response(502), httpx.Response(200, json={"ok": True})])
+    mock_upstream(handler)
+
+    response = await request_with_retry("GET", URL, CircuitBreaker(10, 30), retries=2)
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_the_limit(mock_upstream):
+    handler, calls = counting([httpx.Response(503)])
+    mock_upstream(handler)
+
+    response = await request_with_retry("GET", URL, CircuitBreaker(10, 30), retries=2)
+
+    assert response.status_code == 503
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried_once_it_may_have_reached_the_upstream(mock_upstream):
+    handler, calls = counting([httpx.Response(503), httpx.Response(200)])
+    mock_upstream(handler)
+
+    response = await request_with_retry("POST", URL, CircuitBreaker(10, 30), retries=2)
+
+    assert response.status_code == 503
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_post_read_timeout_is_not_retried(mock_upstream):
+    handler, calls = counting([httpx.ReadTimeout("timed out"), httpx.Response(200)])
+    mock_upstream(handler)
+
+    with pytest.raises(httpx.ReadTimeout):
+        await request_with_retry("POST", URL, CircuitBreaker(10, 30), retries=2)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_post_is_retried_when_the_connection_was_never_made(mock_upstream):
+    handler, calls = counting([httpx.ConnectError("refused"), httpx.Response(201)])
+    mock_upstream(handler)
+
+    response = await request_with_retry("POST", URL, CircuitBreaker(10, 30), retries=2)
+
+    assert response.status_code == 201
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_timeouts_are_retried_then_raised(mock_upstream):
+    handler, calls = counting([httpx.ReadTimeout("timed out")])
+    mock_upstream(handler)
+
+    with pytest.raises(httpx.ReadTimeout):
+        await request_with_retry("GET", URL, CircuitBreaker(10, 30), retries=2)
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_threshold_and_fails_fast(mock_upstream):
+    handler, calls = counting([httpx.Response(500)])
+    mock_upstream(handler)
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    await request_with_retry("GET", URL, breaker, retries=2)
+    assert breaker.is_open
+
+    with pytest.raises(CircuitOpenError):
+        await request_with_retry("GET", URL, breaker, retries=2)
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_half_open_breaker_lets_exactly_one_probe_through(mock_upstream):
+    release = asyncio.Event()
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await release.wait()
+        return httpx.Response(200)
+
+    mock_upstream(handler)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker.opened_at -= 31  # cool-down over: half-open
+
+    probe = asyncio.create_task(request_with_retry("GET", URL, breaker, retries=0))
+    await asyncio.sleep(0)
+    # Bounded so a breaker that lets them through fails the test instead of hanging it
+    others = await asyncio.wait_for(asyncio.gather(
+        *(request_with_retry("GET", URL, breaker, retries=0) for _ in range(20)),
+        return_exceptions=True,
+    ), timeout=1)
+    assert all(isinstance(result, CircuitOpenError) for result in others)
+
+    release.set()
+    assert (await probe).status_code == 200
+    assert len(calls) == 1
+    # The successful probe closed the breaker
+    assert (await request_with_retry("GET", URL, breaker, retries=0)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_the_breaker(mock_upstream):
+    handler, calls = counting([httpx.Response(503)])
+    mock_upstream(handler)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker.opened_at -= 31
+
+    await request_with_retry("GET", URL, breaker, retries=0)
+
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        await request_with_retry("GET", URL, breaker, retries=0)
+    assert len(calls) == 1
+
+
+def test_lost_probe_frees_the_slot_after_a_cool_down():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker.opened_at -= 31
+    breaker.before_call()  # probe taken, never reports back
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.probe_started_at -= 31
+    breaker.before_call()
+
+
+@pytest.mark.asyncio
+async def test_paystack_surfaces_an_open_breaker_as_paystack_error(mock_upstream, monkeypatch):
+    from app.api.v1.transactions import Paystack as paystack_module
+
+    handler, calls = counting([httpx.Response(503)])
+    mock_upstream(handler)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    monkeypatch.setattr(paystack_module, "paystack_breaker", breaker)
+
+    with pytest.raises(paystack_module.PaystackError):
+        await paystack_module.Paystack().verify_payment("ref")
+    with pytest.raises(paystack_module.PaystackError, match="open"):
+        await paystack_module.Paystack().verify_payment("ref")
+    assert len(calls) == 1
@@ -0,0 +1,243 @@
+"""Replays of recorded Paystack webhook deliveries.
+
+The signature tests and dead-letter tests run anywhere. The settlement
+replays need a real Postgres (TEST_DATABASE_URL).
+"""
+import hashlib
+import hmac
+import json
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.api.v1.auth.models import User
+from app.api.v1.transactions import routes as transaction_routes
+from app.api.v1.transactions import webhooks
+from app.api.v1.transactions.models import LedgerEntry, Transaction, TransactionStatus, TransactionType, Wallet
+from app.core.config import settings
+
+FIXTURES = Path(__file__).parent / "fixtures" / "paystack"
+CHARGE_SUCCESS = (FIXTURES / "charge_success.json").read_bytes()
+SECRET = "sk_test_replay"
+
+
+def sign(body: bytes) -> str:
+    return hmac.new(SECRET.encode(), body, hashlib.sha512).hexdigest()
+
+
+@pytest.fixture
+def webhook_client(monkeypatch):
+    """Client for the webhook route; returns it with the list of queued bodies."""
+    monkeypatch.setattr(settings, "PAYSTACK_SECRET_KEY", SECRET)
+    queued = []
+
+    async def enqueue(body: bytes) -> None:
+        queued.append(body)
+
+    monkeypatch.setattr(transaction_routes, "enqueue_paystack_event", enqueue)
+    app = FastAPI()
+    app.include_router(transaction_routes.transaction_router, prefix="/transactions")
+    return TestClient(app), queued
+
+
+def test_validly_signed_delivery_is_queued_verbatim(webhook_client):
+    client, queued = webhook_client
+
+    response = client.post(
+        "/transactions/webhook/paystack", content=CHARGE_SUCCESS,
+        headers={"x-paystack-signature": sign(CHARGE_SUCCESS)},
+    )
+
+    assert response.status_code == 200
+    assert queued == [CHARGE_SUCCESS]
+
+
+@pytest.mark.parametrize("signature", [None, "", "0" * 128, sign(b"something else")])
+def test_badly_signed_delivery_is_rejected(webhook_client, signature):
+    client, queued = webhook_client
+    headers = {"x-paystack-signature": signature} if signature is not None else {}
+
+    response = client.post("/transactions/webhook/paystack", content=CHARGE_SUCCESS, headers=headers)
+
+    assert response.status_code == 401
+    assert queued == []
+
+
+def test_tampered_body_fails_the_original_signature(webhook_client):
+    client, queued = webhook_client
+    tampered = CHARGE_SUCCESS.replace(b'"amount":10000', b'"amount":99990000')
+
+    response = client.post(
+        "/transactions/webhook/paystack", content=tampered,
+        headers={"x-paystack-signature": sign(CHARGE_SUCCESS)},
+    )
+
+    assert response.status_code == 401
+    assert queued == []
+
+
+# -------------------------------------------------------
+# settlement replays
+# -------------------------------------------------------
+
+async def create_pending_topup(session_factory, event: dict) -> tuple[uuid.UUID, uuid.UUID]:
+    async with session_factory() as session:
+        user = User(first_name="Test", email=f"{uuid.uuid4()}@example.com")
+        wallet = Wallet(user=user, balance=Decimal("0.00"))
+        transaction = Transaction(
+            user=user,
+            wallet=wallet,
+            transaction_type=TransactionType.TOPUP.value,
+            amount=Decimal(event["data"]["amount"]) / 100,
+            reference=event["data"]["reference"],
+        )
+        session.add_all([user, wallet, transaction])
+        await session.commit()
+        return wallet.id, transaction.id
+
+
+async def deliver(session_factory, event: dict) -> None:
+    async with session_factory() as session:
+        await webhooks.process_paystack_event(event, session)
+
+
+async def load_state(session_factory, wallet_id: uuid.UUID, transaction_id: uuid.UUID):
+    async with session_factory() as session:
+        balance = (await session.execute(select(Wallet.balance).where(Wallet.id == wallet_id))).scalar_one()
+        status = (await session.execute(
+            select(Transaction.status).where(Transaction.id == transaction_id)
+        )).scalar_one()
+        legs = list((await session.execute(
+            select(LedgerEntry).where(LedgerEntry.transaction_id == transaction_id)
+        )).scalars())
+    return balance, status, legs
+
+
+@pytest.mark.asyncio
+async def test_duplicate_delivery_credits_the_wallet_once(session_factory):
+    event = json.loads(CHARGE_SUCCESS)
+    wallet_id, transaction_id = await create_pending_topup(session_factory, event)
+
+    await deliver(session_factory, event)
+    await deliver(session_factory, event)
+
+    balance, status, legs = await load_state(session_factory, wallet_id, transaction_id)
+    assert balance == Decimal("100.00")
+    assert status == TransactionStatus.SUCCESS.value
+    assert len(legs) == 2  # one journal: the wallet leg and its external counter leg
+
+
+@pytest.mark.asyncio
+async def test_amount_mismatch_leaves_the_transaction_pending(session_factory):
+    event = json.loads(CHARGE_SUCCESS)
+    wallet_id, transaction_id = await create_pending_topup(session_factory, event)
+    event["data"]["amount"] = 1000  # paid 10.00 against a 100.00 top-up
+
+    await deliver(session_factory, event)
+
+    balance, status, legs = await load_state(session_factory, wallet_id, transaction_id)
+    assert balance == Decimal("0.00")
+    assert status == TransactionStatus.PENDING.value
+    assert legs == []
+
+
+@pytest.mark.asyncio
+async def test_unknown_reference_changes_nothing(session_factory):
+    event = json.loads(CHARGE_SUCCESS)
+    wallet_id, transaction_id = await create_pending_topup(session_factory, event)
+    event["data"]["reference"] = "not-ours"
+
+    await deliver(session_factory, event)
+
+    balance, status, legs = await load_state(session_factory, wallet_id, transaction_id)
+    assert (balance, status, legs) == (Decimal("0.00"), TransactionStatus.PENDING.value, [])
+
+
+# -------------------------------------------------------
+# dead-lettering
+# -------------------------------------------------------
+
+class FakeStreams:
+    """Just enough of the Redis stream commands for _handle_entries."""
+
+    def __init__(self, times_delivered: int = 1):
+        self.times_delivered = times_delivered
+        self.acked = []
+        self.dead = []
+
+    async def xack(self, stream, group, message_id):
+        self.acked.append(message_id)
+
+    async def xpending_range(self, stream, group, min, max, count):
+        return [{"message_id": min, "times_delivered": self.times_delivered}]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, streams: FakeStreams):
+        self.streams = streams
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def xadd(self, stream, fields, **kwargs):
+        self.commands.append(lambda: self.streams.dead.append((stream, fields)))
+
+    def xack(self, stream, group, message_id):
+        self.commands.append(lambda: self.streams.acked.append(message_id))
+
+    async def execute(self):
+        for command in self.commands:
+            command()
+
+
+@pytest.mark.asyncio
+async def test_unparseable_event_is_dead_lettered_at_once(monkeypatch):
+    streams = FakeStreams()
+    monkeypatch.setattr(webhooks, "redis_client", streams)
+
+    await webhooks._handle_entries([("1-0", {"payload": "{not json"})])
+
+    assert streams.acked == ["1-0"]
+    [(stream, fields)] = streams.dead
+    assert stream == webhooks.PAYSTACK_DEAD_LETTER_STREAM
+    assert fields["message_id"] == "1-0"
+    assert fields["payload"] == "{not json"
+
+
+@pytest.mark.asyncio
+async def test_failing_event_is_retried_then_dead_lettered(monkeypatch):
+    streams = FakeStreams()
+    monkeypatch.setattr(webhooks, "redis_client", streams)
+    monkeypatch.setattr(settings, "PAYSTACK_EVENT_MAX_DELIVERIES", 3)
+
+    async def fail(event, session):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(webhooks, "process_paystack_event", fail)
+    entry = ("2-0", {"payload": CHARGE_SUCCESS.decode()})
+
+    for times_delivered in (1, 2):
+        streams.times_delivered = times_delivered
+        await webhooks._handle_entries([entry])
+        # Still pending, so xautoclaim hands it out again
+        assert streams.acked == [] and streams.dead == []
+
+    streams.times_delivered = 3
+    await webhooks._handle_entries([entry])
+
+    assert streams.acked == ["2-0"]
+    [(stream, fields)] = streams.dead
+    assert stream == webhooks.PAYSTACK_DEAD_LETTER_STREAM
+    assert "database down" in fields["reason"]
@@ -0,0 +1,230 @@
+"""Read replica routing, with a fake Redis and the test database standing in
+for both the primary and the replica (needs TEST_DATABASE_URL)."""
+import uuid
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import Depends, FastAPI, HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from starlette.requests import Request
+
+from app.api.v1.auth.models import User
+from app.core import cache, database
+from app.core.config import settings
+
+TOKEN = "Bearer writer"
+
+
+class FakeRedis:
+    """The few commands the routing and the cache use; `down` makes every call fail."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiries = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise RedisConnectionError("redis is down")
+
+    async def exists(self, key):
+        self._check()
+        return int(key in self.data)
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self._check()
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        self._check()
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        self.expiries[key] = ex
+        return True
+
+    async def eval(self, script, numkeys, key, token):
+        self._check()
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(database, "redis_client", redis)
+    monkeypatch.setattr(cache, "redis_client", redis)
+    monkeypatch.setattr("app.core.redis.redis_client", redis)
+    return redis
+
+
+@pytest_asyncio.fixture
+async def replica(database_url, monkeypatch):
+    """Separate primary and replica engines, both on the test database, as with POSTGRES_READ_URL set."""
+    primary_engine = create_async_engine(database_url, poolclass=NullPool)
+    replica_engine = create_async_engine(database_url, poolclass=NullPool)
+    primary_sessions = sessionmaker(bind=primary_engine, class_=AsyncSession, expire_on_commit=False)
+    replica_sessions = sessionmaker(
+        bind=replica_engine, class_=AsyncSession, expire_on_commit=False, info={"read_only": True}
+    )
+    monkeypatch.setattr(database, "engine", primary_engine)
+    monkeypatch.setattr(database, "read_engine", replica_engine)
+    monkeypatch.setattr(database, "AsyncSessionLocal", primary_sessions)
+    monkeypatch.setattr(database, "AsyncReadSessionLocal", replica_sessions)
+    monkeypatch.setattr(cache, "AsyncSessionLocal", primary_sessions)
+    yield replica_sessions
+    async with primary_engine.begin() as conn:
+        await conn.execute(text("TRUNCATE users CASCADE"))
+    await primary_engine.dispose()
+    await replica_engine.dispose()
+
+
+def make_request(method: str, authorization: str = None) -> Request:
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers})
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.middleware("http")(database.read_your_writes_middleware)
+
+    @app.post("/read-only")
+    async def read_only(session: AsyncSession = Depends(database.async_get_db)):
+        await session.execute(text("SELECT 1"))
+
+    @app.post("/write")
+    async def write(session: AsyncSession = Depends(database.async_get_db)):
+        session.add(User(first_name="Test", email=f"{uuid.uuid4()}@example.com"))
+        await session.flush()
+
+    @app.post("/write-then-fail")
+    async def write_then_fail(session: AsyncSession = Depends(database.async_get_db)):
+        session.add(User(first_name="Test", email=f"{uuid.uuid4()}@example.com"))
+        await session.flush()
+        raise HTTPException(status_code=400, detail="rejected")
+
+    @app.get("/where")
+    async def where(session: AsyncSession = Depends(database.async_get_read_db)):
+        return {"replica": bool(session.info.get("read_only"))}
+
+    return app
+
+
+@pytest_asyncio.fixture
+async def client(replica, fake_redis):
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def sticky_keys(redis: FakeRedis) -> list:
+    return [key for key in redis.data if key.startswith("read_your_writes:")]
+
+
+# -------------------------------------------------------
+# _use_replica
+# -------------------------------------------------------
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["GET", "HEAD", "OPTIONS"])
+async def test_safe_methods_go_to_the_replica(replica, fake_redis, method):
+    assert await database._use_replica(make_request(method, TOKEN))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["POST", "PUT", "PATCH", "DELETE"])
+async def test_unsafe_methods_stay_on_the_primary(replica, fake_redis, method):
+    assert not await database._use_replica(make_request(method, TOKEN))
+
+
+@pytest.mark.asyncio
+async def test_recent_writer_stays_on_the_primary(replica, fake_redis):
+    await fake_redis.set(database._sticky_key(make_request("GET", TOKEN)), "1")
+
+    assert not await database._use_replica(make_request("GET", TOKEN))
+    assert await database._use_replica(make_request("GET", "Bearer someone-else"))
+    assert await database._use_replica(make_request("GET"))
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_the_primary(replica, fake_redis):
+    fake_redis.down = True
+
+    assert not await database._use_replica(make_request("GET", TOKEN))
+
+
+@pytest.mark.asyncio
+async def test_without_a_replica_everything_uses_the_primary(fake_redis, monkeypatch):
+    monkeypatch.setattr(database, "read_engine", database.engine)
+
+    assert not await database._use_replica(make_request("GET"))
+
+
+# -------------------------------------------------------
+# read_your_writes_middleware
+# -------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_commit_that_wrote_makes_the_caller_sticky(client, fake_redis):
+    response = await client.post("/write", headers={"authorization": TOKEN})
+
+    assert response.status_code == 200
+    [key] = sticky_keys(fake_redis)
+    assert fake_redis.expiries[key] == settings.READ_YOUR_WRITES_WINDOW
+    assert (await client.get("/where", headers={"authorization": TOKEN})).json() == {"replica": False}
+    assert (await client.get("/where", headers={"authorization": "Bearer other"})).json() == {"replica": True}
+
+
+@pytest.mark.asyncio
+async def test_commit_without_a_write_sets_no_marker(client, fake_redis):
+    response = await client.post("/read-only", headers={"authorization": TOKEN})
+
+    assert response.status_code == 200
+    assert sticky_keys(fake_redis) == []
+    assert (await client.get("/where", headers={"authorization": TOKEN})).json() == {"replica": True}
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_write_sets_no_marker(client, fake_redis):
+    response = await client.post("/write-then-fail", headers={"authorization": TOKEN})
+
+    assert response.status_code == 400
+    assert sticky_keys(fake_redis) == []
+
+
+@pytest.mark.asyncio
+async def test_marker_failure_does_not_fail_the_write(client, fake_redis):
+    fake_redis.down = True
+
+    response = await client.post("/write", headers={"authorization": TOKEN})
+
+    assert response.status_code == 200
+    assert (await client.get("/where", headers={"authorization": TOKEN})).json() == {"replica": False}
+
+
+# -------------------------------------------------------
+# cached reads
+# -------------------------------------------------------
+
+@cache.cached(bool, tags=("replica-test",))
+async def loaded_from_replica(session: AsyncSession) -> bool:
+    return bool(session.info.get("read_only"))
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_loads_from_the_primary(replica, fake_redis):
+    async with replica() as session:
+        assert not await loaded_from_replica(session)
+        # The stored entry came from the primary too
+        assert not await loaded_from_replica(session)
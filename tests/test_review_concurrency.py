@@ -0,0 +1,104 @@
+"""Parallel review edits and deletes against a real Postgres (needs TEST_DATABASE_URL)."""
+import asyncio
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.api.v1.auth.models import User
+from app.api.v1.easybuy.models import Product, ProductReview
+from app.api.v1.easybuy.schemas import ProductReviewCreate
+from app.api.v1.easybuy.service import ProductService
+
+product_service = ProductService()
+
+
+@pytest.fixture(autouse=True)
+def no_cache_invalidation(monkeypatch):
+    # The services invalidate the catalog cache on commit; there is no Redis here
+    async def invalidate_tags(*tags):
+        pass
+
+    monkeypatch.setattr("app.api.v1.easybuy.service.invalidate_tags", invalidate_tags)
+
+
+async def create_reviewed_product(session_factory, ratings: list[int]) -> tuple[uuid.UUID, uuid.UUID, list[uuid.UUID]]:
+    async with session_factory() as session:
+        user = User(first_name="Test", email=f"{uuid.uuid4()}@example.com")
+        product = Product(
+            owner=user, name="Kettle", description="Boils water", price=Decimal("20.00"),
+            quantity=1, image="https://example.com/kettle.png", redirect_link="https://example.com/kettle",
+        )
+        session.add_all([user, product])
+        await session.flush()
+        review_ids = []
+        for rating in ratings:
+            review = await product_service.create_product_review(
+                ProductReviewCreate(product_id=product.id, user_id=user.id, rating=rating), session
+            )
+            review_ids.append(review.id)
+        await session.commit()
+        return product.id, user.id, review_ids
+
+
+async def run(session_factory, call) -> bool:
+    """Run one service call in a transaction of its own, like a request; False on a 404."""
+    async with session_factory() as session:
+        try:
+            await call(session)
+        except HTTPException as exc:
+            assert exc.status_code == 404
+            return False
+        await session.commit()
+        return True
+
+
+async def assert_aggregates_match_reviews(session_factory, product_id: uuid.UUID) -> None:
+    async with session_factory() as session:
+        product = await session.get(Product, product_id)
+        ratings = list((await session.execute(
+            select(ProductReview.rating).where(ProductReview.product_id == product_id)
+        )).scalars())
+    histogram = Counter(ratings)
+    assert product.rating_count == len(ratings)
+    assert product.rating_sum == sum(ratings)
+    assert product.rating_histogram == {rating: histogram[rating] for rating in range(1, 6)}
+
+
+@pytest.mark.asyncio
+async def test_parallel_deletes_of_one_review_count_it_once(session_factory):
+    product_id, _, [review_id, _] = await create_reviewed_product(session_factory, [4, 2])
+
+    results = await asyncio.gather(*(
+        run(session_factory, lambda session: product_service.delete_product_review(review_id, session))
+        for _ in range(10)
+    ), return_exceptions=True)
+
+    assert results.count(True) == 1 and results.count(False) == 9
+    await assert_aggregates_match_reviews(session_factory, product_id)
+
+
+@pytest.mark.asyncio
+async def test_parallel_edits_and_deletes_keep_aggregates_exact(session_factory):
+    product_id, user_id, review_ids = await create_reviewed_product(session_factory, [1, 2, 3, 4, 5, 5])
+
+    def edit(review_id, rating):
+        data = ProductReviewCreate(product_id=product_id, user_id=user_id, rating=rating)
+        return lambda session: product_service.update_product_review(review_id, data, session)
+
+    def delete(review_id):
+        return lambda session: product_service.delete_product_review(review_id, session)
+
+    calls = []
+    for review_id in review_ids:
+        calls += [edit(review_id, rating) for rating in (1, 3, 5, 2, 4)]
+    calls += [delete(review_ids[0]), delete(review_ids[0]), delete(review_ids[3])]
+
+    # Let every call finish before checking, so none is still writing during teardown
+    results = await asyncio.gather(*(run(session_factory, call) for call in calls), return_exceptions=True)
+
+    assert not [result for result in results if isinstance(result, Exception)]
+    await assert_aggregates_match_reviews(session_factory, product_id)
@@ -0,0 +1,100 @@
+"""Parallel wallet movements against a real Postgres (needs TEST_DATABASE_URL)."""
+import asyncio
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from app.api.v1.auth.models import User
+from app.api.v1.transactions.models import LedgerAccount, LedgerEntry, Wallet
+from app.api.v1.transactions.service import WalletService
+
+wallet_service = WalletService()
+
+
+async def create_wallet(session_factory, balance: str) -> uuid.UUID:
+    async with session_factory() as session:
+        user = User(first_name="Test", email=f"{uuid.uuid4()}@example.com")
+        wallet = Wallet(user=user, balance=Decimal(balance))
+        session.add_all([user, wallet])
+        await session.commit()
+        return wallet.id
+
+
+async def move(session_factory, wallet_id: uuid.UUID, amount: int) -> bool:
+    """Deposit (amount > 0) or withdraw (amount < 0) in a transaction of its own, like a request."""
+    async with session_factory() as session:
+        if amount > 0:
+            wallet = await wallet_service.deposit(wallet_id, amount, session)
+        else:
+            wallet = await wallet_service.withdraw(wallet_id, -amount, session)
+        await session.commit()
+        return wallet is not None
+
+
+async def load_state(session_factory, wallet_id: uuid.UUID):
+    async with session_factory() as session:
+        balance = (await session.execute(
+            select(Wallet.balance).where(Wallet.id == wallet_id)
+        )).scalar_one()
+        wallet_legs = list((await session.execute(
+            select(LedgerEntry).where(
+                LedgerEntry.wallet_id == wallet_id,
+                LedgerEntry.account == LedgerAccount.WALLET.value
+            ).order_by(LedgerEntry.created_at)
+        )).scalars())
+        journal_ids = [leg.journal_id for leg in wallet_legs]
+        all_legs = list((await session.execute(
+            select(LedgerEntry).where(LedgerEntry.journal_id.in_(journal_ids))
+        )).scalars())
+    return balance, wallet_legs, all_legs
+
+
+def assert_ledger_consistent(initial: Decimal, balance: Decimal, wallet_legs, all_legs) -> None:
+    # The wallet's legs add up to exactly the change in its balance
+    assert sum((leg.amount for leg in wallet_legs), Decimal(0)) == balance - initial
+    # Every journal balances: the wallet leg and its counter leg cancel out
+    journals = defaultdict(Decimal)
+    for leg in all_legs:
+        journals[leg.journal_id] += leg.amount
+    assert set(journals.values()) == {Decimal(0)}
+    # Each movement started from the balance the previous one left: no lost update
+    running = initial
+    for leg in wallet_legs:
+        assert leg.balance_after == running + leg.amount
+        assert leg.balance_after >= 0
+        running = leg.balance_after
+    assert running == balance
+
+
+@pytest.mark.asyncio
+async def test_parallel_withdrawals_never_overdraw(session_factory):
+    initial = Decimal("100.00")
+    wallet_id = await create_wallet(session_factory, str(initial))
+
+    results = await asyncio.gather(*(move(session_factory, wallet_id, -3) for _ in range(40)))
+
+    balance, wallet_legs, all_legs = await load_state(session_factory, wallet_id)
+    # 33 withdrawals of 3 fit in 100; the other 7 are refused, none overdraw
+    assert sum(results) == 33
+    assert balance == Decimal("1.00")
+    assert len(wallet_legs) == 33
+    assert_ledger_consistent(initial, balance, wallet_legs, all_legs)
+
+
+@pytest.mark.asyncio
+async def test_parallel_deposits_and_withdrawals_lose_no_update(session_factory):
+    initial = Decimal("10.00")
+    wallet_id = await create_wallet(session_factory, str(initial))
+    amounts = [5, -7, 3, -2, -11, 8, -4, 6, -9, 1] * 4
+
+    results = await asyncio.gather(*(move(session_factory, wallet_id, amount) for amount in amounts))
+
+    balance, wallet_legs, all_legs = await load_state(session_factory, wallet_id)
+    applied = sum(Decimal(amount) for amount, ok in zip(amounts, results) if ok)
+    assert balance == initial + applied
+    assert balance >= 0
+    assert len(wallet_legs) == sum(results)
+    assert_ledger_consistent(initial, balance, wallet_legs, all_legs)
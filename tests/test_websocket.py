@@ -0,0 +1,137 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from app.api.v1.auth.models import User
+from app.api.v1.notifications.schemas import NotificationCreate
+from app.core.config import settings
+from app.core.database import run_on_commit
+from app.core.websocket import CHANNEL_PREFIX, ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self, stall: bool = False):
+        self.stall = stall
+        self.sent = []
+        self.closed = False
+
+    async def send_json(self, data):
+        if self.stall:
+            await asyncio.Event().wait()
+        self.sent.append(data)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePubSubRedis:
+    """Records what the manager publishes, as the pub/sub messages listen() would receive."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def publish(self, channel, data):
+        self.messages.append({"type": "pmessage", "channel": channel, "data": data})
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakePubSubRedis):
+        self.redis = redis
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def publish(self, channel, data):
+        self.queued.append((channel, data))
+
+    async def execute(self):
+        for channel, data in self.queued:
+            await self.redis.publish(channel, data)
+
+
+def register(manager: ConnectionManager, user_id: uuid.UUID, socket: FakeSocket) -> None:
+    manager.active_connections.setdefault(user_id, {}).setdefault("notifications", []).append(socket)
+
+
+def message(user_id, data) -> dict:
+    payload = {"user_id": str(user_id) if user_id else None, "data": data}
+    return {"type": "pmessage", "channel": CHANNEL_PREFIX + "notifications", "data": json.dumps(payload)}
+
+
+@pytest.mark.asyncio
+async def test_stalled_socket_does_not_hold_up_later_messages(monkeypatch):
+    monkeypatch.setattr(settings, "WEBSOCKET_SEND_TIMEOUT", 0.05)
+    manager = ConnectionManager(redis=FakePubSubRedis())
+    stalled_user, other_user = uuid.uuid4(), uuid.uuid4()
+    stalled, other = FakeSocket(stall=True), FakeSocket()
+    register(manager, stalled_user, stalled)
+    register(manager, other_user, other)
+
+    manager._dispatch(message(stalled_user, {"n": 1}))
+    manager._dispatch(message(other_user, {"n": 2}))
+    await asyncio.sleep(0.01)
+
+    assert other.sent == [{"n": 2}]
+
+    await asyncio.sleep(0.1)
+    # The stalled socket timed out, was dropped and closed
+    assert stalled_user not in manager.active_connections
+    assert stalled.closed
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_every_connected_user():
+    manager = ConnectionManager(redis=FakePubSubRedis())
+    sockets = [FakeSocket() for _ in range(3)]
+    for socket in sockets:
+        register(manager, uuid.uuid4(), socket)
+
+    await manager.broadcast("notifications", {"n": 1})
+    for published in manager.redis.messages:
+        manager._dispatch(published)
+    await asyncio.sleep(0.01)
+
+    assert [socket.sent for socket in sockets] == [[{"n": 1}]] * 3
+
+
+@pytest.mark.asyncio
+async def test_stored_notification_reaches_recipient_sockets_after_commit(session_factory, monkeypatch):
+    # Imported here: the service pulls in the Firebase client, which needs credentials
+    from app.api.v1.notifications import service as notification_service_module
+
+    manager = ConnectionManager(redis=FakePubSubRedis())
+    monkeypatch.setattr(notification_service_module, "manager", manager)
+    recipient, bystander = FakeSocket(), FakeSocket()
+
+    async with session_factory() as session:
+        users = [User(first_name="Test", email=f"{uuid.uuid4()}@example.com") for _ in range(2)]
+        session.add_all(users)
+        await session.flush()
+        register(manager, users[0].id, recipient)
+        register(manager, users[1].id, bystander)
+
+        notification = await notification_service_module.NotificationService().store_notification(
+            NotificationCreate(title="Hello", message="World"), [users[0].id], session
+        )
+        # Nothing goes out before the commit
+        assert manager.redis.messages == []
+        await session.commit()
+        await run_on_commit(session)
+
+    assert len(manager.redis.messages) == 1
+    for published in manager.redis.messages:
+        manager._dispatch(published)
+    await asyncio.sleep(0.01)
+
+    [data] = recipient.sent
+    assert (data["id"], data["title"], data["message"]) == (str(notification.id), "Hello", "World")
+    assert bystander.sent == []